@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark Module
+
+Offline benchmark of the local and publishing pipelines:
+1. Generates a synthetic blog directory (posts, images, code blocks)
+2. Serves a local stub of the WeChat API with configurable latency
+3. Runs post discovery, BlogProcessor, rendering and WeChatPublisher
+   against it inside a temporary working directory
+4. Reports per-stage timings and throughput, optionally as JSON
+
+Nothing outside the temporary directory is read or written, so it can run
+before deploying to catch performance regressions.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import logging
+import tempfile
+import threading
+import itertools
+import contextlib
+from datetime import date
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, List
+
+SUBDIR = "myNotes"
+
+CODE_SAMPLE = '''```python
+def fibonacci(n: int) -> int:
+    """Return the n-th Fibonacci number"""
+    a, b = 0, 1
+    for _ in range(n):
+        a, b = b, a + b  # {index}
+    return a
+```
+'''
+
+PARAGRAPH = ("Lorem ipsum dolor sit amet, `inline code` consectetur adipiscing elit, "
+             "sed do eiusmod tempor **incididunt** ut labore et dolore magna aliqua. "
+             "See [the docs](https://example.com/docs) for details.\n")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Emulates the token, media/upload and media/uploadnews endpoints"""
+
+    latency = 0.05
+    counter = itertools.count(1)
+    calls: Dict[str, int] = {}
+    bytes_received = 0
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, payload: dict):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _record(self, size: int) -> str:
+        endpoint = self.path.split('?')[0]
+        with StubHandler.lock:
+            StubHandler.calls[endpoint] = StubHandler.calls.get(endpoint, 0) + 1
+            StubHandler.bytes_received += size
+        return endpoint
+
+    def do_GET(self):
+        self._record(0)
+        time.sleep(self.latency)
+        self._reply({"access_token": "BENCHMARK_TOKEN", "expires_in": 7200})
+
+    def do_POST(self):
+        size = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(size)
+        endpoint = self._record(size)
+        time.sleep(self.latency)
+        media_id = f"media_{next(StubHandler.counter)}"
+        if endpoint.endswith('/media/upload'):
+            self._reply({"type": "image", "media_id": media_id, "created_at": int(time.time()),
+                         "url": f"http://stub.invalid/{media_id}.png"})
+        elif endpoint.endswith('/media/uploadnews'):
+            self._reply({"type": "news", "media_id": media_id, "created_at": int(time.time())})
+        else:
+            self._reply({"errcode": 40066, "errmsg": "invalid url"})
+
+
+def start_stub(latency: float) -> ThreadingHTTPServer:
+    """在随机端口上启动模拟服务器"""
+    StubHandler.latency = latency
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def generate_vault(blog_dir: Path, posts: int, images: int, image_size: int,
+                   code_blocks: int, paragraphs: int, seed: int = 0) -> int:
+    """
+    Generate a synthetic blog directory dated today
+
+    Returns:
+        Total bytes of markdown written
+    """
+    rng = random.Random(seed)
+    post_dir = blog_dir / SUBDIR
+    (post_dir / "images").mkdir(parents=True, exist_ok=True)
+    today = date.today().isoformat()
+    total = 0
+    for index in range(posts):
+        blocks = [PARAGRAPH] * paragraphs
+        for image in range(images):
+            image_name = f"post{index}_{image}.png"
+            with open(post_dir / "images" / image_name, 'wb') as f:
+                f.write(rng.randbytes(image_size))
+            blocks.insert(rng.randrange(len(blocks) + 1), f"![image {image}](images/{image_name})\n")
+        for block in range(code_blocks):
+            blocks.insert(rng.randrange(len(blocks) + 1), CODE_SAMPLE.replace('{index}', str(block)))
+        text = (f"---\ntitle: Benchmark post {index}\ndate: {today}\n"
+                f"description: Synthetic post {index}\n---\n\n# Post {index}\n\n" + "\n".join(blocks))
+        (post_dir / f"post{index}.md").write_text(text, encoding='utf-8')
+        total += len(text.encode('utf-8'))
+    return total
+
+
+class Benchmark:
+    def __init__(self):
+        self.results: List[dict] = []
+
+    def stage(self, name: str, items: int, function, *args, **kwargs):
+        """运行一个阶段并记录耗时与吞吐量"""
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        self.results.append({
+            "stage": name,
+            "seconds": round(elapsed, 4),
+            "items": items,
+            "items_per_second": round(items / elapsed, 2) if elapsed > 0 else None,
+        })
+        print(f"{name:<28} {elapsed:>9.3f}s {items:>7} {items / elapsed if elapsed else 0:>10.1f}/s")
+        return result
+
+
+def configure(blog_dir: Path, api_base: str, paced: bool):
+    """Point both pipelines at the synthetic vault and the stub server"""
+    import blog_processor
+    import wechat_publisher
+
+    for module in (blog_processor, wechat_publisher):
+        module.BLOG_DIR = str(blog_dir)
+        module.BLOG_SUBDIRS = [SUBDIR]
+    wechat_publisher.WECHAT_CONFIG = {"APP_ID": "benchmark", "APP_SECRET": "benchmark"}
+    wechat_publisher.WECHAT_API_BASE = api_base
+    # Never fetched: every synthetic post has its own images, or a local cover
+    cover = blog_dir / "cover.png"
+    cover.write_bytes(os.urandom(1024))
+    wechat_publisher.DEFAULT_COVER_IMAGE = str(cover)
+    if not paced:
+        wechat_publisher.API_RATE_LIMIT = {
+            family: {"rate": 1e9, "burst": 10 ** 9, "daily": None}
+            for family in wechat_publisher.API_RATE_LIMIT
+        }
+
+
+def run(args) -> List[dict]:
+    """Generate the vault, run every stage and return the results"""
+    workdir = Path(tempfile.mkdtemp(prefix="blog_publisher_bench_"))
+    previous_cwd = os.getcwd()
+    server = start_stub(args.latency)
+    try:
+        # Caches, journal, index and quota files are relative to the working directory
+        os.chdir(workdir)
+        blog_dir = workdir / "vault"
+        bench = Benchmark()
+        print(f"{'stage':<28} {'time':>10} {'items':>7} {'throughput':>12}")
+
+        markdown_bytes = bench.stage("generate vault", args.posts, generate_vault, blog_dir, args.posts,
+                                     args.images, args.image_size, args.code_blocks, args.paragraphs)
+        configure(blog_dir, f"http://127.0.0.1:{server.server_address[1]}", args.paced)
+
+        from post_index import PostIndex
+        from renderer import MarkdownRenderer
+        from blog_processor import BlogProcessor
+        from wechat_publisher import WeChatPublisher, INDEX_FILE
+        import wechat_publisher
+
+        bench.stage("discover (cold index)", args.posts,
+                    lambda: PostIndex(INDEX_FILE).scan(str(blog_dir), [SUBDIR]))
+        bench.stage("discover (warm index)", args.posts,
+                    lambda: PostIndex(INDEX_FILE).scan(str(blog_dir), [SUBDIR]))
+
+        processor = BlogProcessor(output_dir=str(workdir / "processed"), jobs=args.jobs)
+
+        def process():
+            # BlogProcessor prints a line per file
+            with contextlib.redirect_stdout(sys.stdout if args.verbose else io.StringIO()):
+                processor.process_blogs()
+        bench.stage(f"process (jobs={args.jobs})", args.posts, process)
+
+        renderer = MarkdownRenderer(
+            wechat_publisher.MARKDOWN_EXTENSIONS,
+            wechat_publisher.MARKDOWN_EXTENSION_CONFIGS,
+            wechat_publisher.HTML_TEMPLATE,
+            inline_css=wechat_publisher.INLINE_CSS
+        )
+        sources = [path.read_text(encoding='utf-8') for path in sorted((blog_dir / SUBDIR).glob('*.md'))]
+        bench.stage("render", args.posts, lambda: [renderer.render(text) for text in sources])
+
+        publisher = WeChatPublisher()
+        summary = bench.stage(f"publish cold (workers={args.workers})", args.posts, publisher.run, args.workers)
+        failed = len(summary["failed"])
+        uploads = dict(StubHandler.calls)
+        bench.stage("publish rerun (journal)", args.posts, publisher.run, args.workers)
+        publisher.force = True
+        bench.stage("publish forced (cached)", args.posts, publisher.run, args.workers)
+
+        print()
+        print(f"markdown: {markdown_bytes / 1024:.1f} KB, images: {args.posts * args.images} x "
+              f"{args.image_size / 1024:.1f} KB, stub latency: {args.latency * 1000:.0f} ms")
+        print(f"stub calls (cold publish): {uploads}")
+        print(f"stub calls (total): {StubHandler.calls}, received {StubHandler.bytes_received / 1024:.1f} KB")
+        if failed:
+            print(f"{failed} posts failed to publish")
+        return bench.results
+    finally:
+        os.chdir(previous_cwd)
+        server.shutdown()
+        if args.keep:
+            print(f"Benchmark files kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark discovery, processing, rendering and publishing offline')
+    parser.add_argument('--posts', type=int, default=100, help='Number of synthetic posts (default: 100)')
+    parser.add_argument('--images', type=int, default=3, help='Images per post (default: 3)')
+    parser.add_argument('--image-size', type=int, default=50 * 1024, help='Bytes per image (default: 51200)')
+    parser.add_argument('--code-blocks', type=int, default=3, help='Code blocks per post (default: 3)')
+    parser.add_argument('--paragraphs', type=int, default=30, help='Paragraphs per post (default: 30)')
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='Stub API latency in seconds (default: 0.05)')
+    parser.add_argument('--workers', type=int, default=4, help='Publisher workers (default: 4)')
+    parser.add_argument('--jobs', type=int, default=1, help='BlogProcessor processes (default: 1)')
+    parser.add_argument('--paced', action='store_true',
+                        help='Keep the configured API_RATE_LIMIT pacing instead of disabling it')
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+    parser.add_argument('--keep', action='store_true', help='Keep the generated files')
+    parser.add_argument('--verbose', action='store_true', help='Show pipeline logs')
+
+    args = parser.parse_args()
+    if args.json:
+        args.json = os.path.abspath(args.json)
+
+    import wechat_publisher  # configures logging on import
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    results = run(args)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"parameters": {k: v for k, v in vars(args).items() if k != 'json'},
+                       "results": results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,47 +5,112 @@
 Blog Processor Module
 
 This module processes markdown blog files by:
-1. Processing blogs for a specific date (defaults to today)
+1. Processing blogs for a specific date (defaults to today) or a date range
 2. Removing markdown frontmatter
 3. Adding custom footer
 4. Generating new markdown files with processed content
 5. Converting local image paths to online URLs
+6. Optionally rebuilding only outputs whose source or config changed
+7. Optionally watching the blog directories and processing changed posts
+8. Streaming each post to its output file in constant memory
+9. Optionally spreading the work across a pool of processes
 """
 
 import os
-from datetime import datetime
+import sys
+import json
+import hashlib
+import contextlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, date, timedelta
 from pathlib import Path
-import re
-from typing import Optional, List
-import frontmatter
+from typing import Optional, List, Dict, Iterable, Iterator, Tuple, Union
 from config import (
     BLOG_DIR,
     BLOG_SUBDIRS,
     ARTICLE_FOOTER,
-    IMAGE_CONFIG
+    IMAGE_CONFIG,
+    INDEX_FILE,
+    WATCH_CONFIG
 )
+from post_index import PostIndex, iter_post_body
+from image_links import rewrite_images, rewrite_images_stream, collect_image_labels
+from build_manifest import BuildManifest
+from watcher import PostWatcher
+
+MANIFEST_FILE = '.manifest.json'
+
+
+def write_atomic(output_path: Path, chunks: Iterable[str]):
+    """Write chunks to a temporary file next to output_path and rename it into place"""
+    temp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.tmp")
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.writelines(chunks)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        # open() may have failed before the file existed
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(temp_path)
+        raise
+
 
 class BlogProcessor:
     """Process markdown blog files according to specified requirements"""
     
-    def __init__(self, target_date: Optional[str] = None, output_dir: Optional[str] = None):
+    def __init__(self, target_date: Optional[str] = None, output_dir: Optional[str] = None,
+                 incremental: bool = False, since: Optional[str] = None, until: Optional[str] = None,
+                 jobs: int = 1):
         """
         Initialize the blog processor
         
         Args:
             target_date: Optional date string in 'YYYY-MM-DD' format
             output_dir: Optional output directory path for processed files
+            incremental: Only rewrite outputs whose source or config changed
+            since: Optional first date of a range in 'YYYY-MM-DD' format
+            until: Optional last date of a range in 'YYYY-MM-DD' format,
+                defaults to today when only since is given
+            jobs: Number of worker processes used to build outputs
         """
         self.target_date = (datetime.strptime(target_date, '%Y-%m-%d').date() 
                            if target_date else datetime.now().date())
+        # Without explicit dates a long-running watch follows the calendar,
+        # and so does the end of a range given only its start
+        self._follow_today = not (target_date or since or until)
+        self._until_today = not (target_date or until)
+        if since or until:
+            self.until = (datetime.strptime(until, '%Y-%m-%d').date()
+                          if until else datetime.now().date())
+            self.since = datetime.strptime(since, '%Y-%m-%d').date() if since else self.until
+        else:
+            self.since = self.until = self.target_date
         self.default_output_dir = os.path.join(os.getcwd(), 'processed_blogs')
         self.output_dir = output_dir or self.default_output_dir
         os.makedirs(self.output_dir, exist_ok=True)
+        self.post_index = PostIndex(INDEX_FILE)
+        self.jobs = max(1, jobs)
+        # (source, error message) of every file that failed to process
+        self.errors: List[Tuple[Path, str]] = []
         
-        # Clean up default output directory if using default path
-        if self.output_dir == self.default_output_dir:
+        self.manifest = None
+        if incremental:
+            # Stale outputs are removed precisely instead of wiping the directory
+            self.manifest = BuildManifest(
+                os.path.join(self.output_dir, MANIFEST_FILE),
+                self._config_digest()
+            )
+        elif self.output_dir == self.default_output_dir:
+            # Clean up default output directory if using default path
             self._cleanup_default_output_dir()
 
+    @staticmethod
+    def _config_digest() -> str:
+        """Digest of the settings that affect every processed file"""
+        config = json.dumps({'footer': ARTICLE_FOOTER, 'image': IMAGE_CONFIG}, sort_keys=True)
+        return hashlib.sha256(config.encode('utf-8')).hexdigest()
+
     def _cleanup_default_output_dir(self):
         """Clean up existing files in the default output directory"""
         if not os.path.exists(self.default_output_dir):
@@ -59,24 +124,37 @@ class BlogProcessor:
                 except OSError as e:
                     print(f"Error removing file {file}: {e}")
 
+    def get_dates(self) -> List[date]:
+        """All dates to process, in order"""
+        return [self.since + timedelta(days=offset)
+                for offset in range((self.until - self.since).days + 1)]
+
+    def get_blog_files_by_date(self) -> Dict[date, List[Path]]:
+        """Scan the configured directories once and bucket blog files by date, sorted by path"""
+        buckets = {}
+        for post in self.post_index.scan(BLOG_DIR, BLOG_SUBDIRS):
+            if post.date and self.since <= post.date <= self.until:
+                buckets.setdefault(post.date, []).append(post.path)
+        # Scan order depends on the filesystem; same-stem files must resolve the same way
+        return {post_date: sorted(paths) for post_date, paths in buckets.items()}
+
     def get_blog_files(self) -> List[Path]:
-        """Get all blog files from configured directories matching target date"""
-        blog_files = []
-        for subdir in BLOG_SUBDIRS:
-            blog_path = Path(BLOG_DIR) / subdir
-            if not blog_path.exists():
-                continue
-            
-            for file in blog_path.glob('**/*.md'):
-                post = frontmatter.load(file)
-                post_date = post.get('date')
-                if post_date:
-                    if isinstance(post_date, str):
-                        post_date = datetime.strptime(post_date, '%Y-%m-%d').date()
-                    if post_date == self.target_date:
-                        blog_files.append(file)
+        """Get all blog files from configured directories matching target date(s)"""
+        buckets = self.get_blog_files_by_date()
+        return [path for post_date in sorted(buckets) for path in buckets[post_date]]
+
+    @staticmethod
+    def _online_image_path(image_path: str) -> Optional[str]:
+        """Online URL for a local image path, None to keep the original"""
+        # Check if path matches any local pattern
+        for pattern in IMAGE_CONFIG['local_patterns']:
+            if image_path.startswith(pattern):
+                # Extract image name and create online URL
+                image_name = image_path.split('/')[-1]
+                return f"{IMAGE_CONFIG['base_url']}/images/{image_name}"
         
-        return blog_files
+        # Keep original if not a local image
+        return None
 
     def process_images(self, content: str, file_path: Path) -> str:
         """
@@ -89,25 +167,29 @@ class BlogProcessor:
         Returns:
             Content with processed image links
         """
-        def replace_image_path(match):
-            alt_text = match.group(1)
-            image_path = match.group(2)
-            
-            # Check if path matches any local pattern
-            for pattern in IMAGE_CONFIG['local_patterns']:
-                if image_path.startswith(pattern):
-                    # Extract image name and create online URL
-                    image_name = image_path.split('/')[-1]
-                    online_path = f"{IMAGE_CONFIG['base_url']}/images/{image_name}"
-                    return f"![{alt_text}]({online_path})"
-            
-            # Return original if not a local image
-            return match.group(0)
+        # Rewrite image nodes in one pass, leaving code blocks alone
+        return rewrite_images(content, self._online_image_path)
+
+    @staticmethod
+    def iter_processed_blog(file_path: Path) -> Iterator[str]:
+        """
+        Stream the processed content of a blog file
         
-        # Match markdown image syntax: ![alt text](image path)
-        image_pattern = r'!\[(.*?)\]\((.*?)\)'
-        processed_content = re.sub(image_pattern, replace_image_path, content)
-        return processed_content
+        The body is read without its frontmatter, image links are rewritten
+        block by block and the footer is appended, so memory stays flat
+        regardless of post size. The file is read twice: the first pass only
+        collects the labels of reference-style images.
+        
+        Args:
+            file_path: Path to the blog file
+            
+        Yields:
+            Chunks of processed content
+        """
+        image_labels = collect_image_labels(iter_post_body(file_path))
+        yield from rewrite_images_stream(iter_post_body(file_path), BlogProcessor._online_image_path,
+                                         image_labels)
+        yield f"\n\n{ARTICLE_FOOTER}"
 
     def process_blog(self, file_path: Path) -> str:
         """
@@ -119,44 +201,186 @@ class BlogProcessor:
         Returns:
             Processed content as string
         """
-        post = frontmatter.load(file_path)
-        content = post.content
-        
-        # Process images
-        content = self.process_images(content, file_path)
-        
-        # Add footer
-        processed_content = f"{content}\n\n{ARTICLE_FOOTER}"
-        return processed_content
+        return ''.join(self.iter_processed_blog(file_path))
 
-    def save_processed_blog(self, original_path: Path, processed_content: str):
+    def get_output_path(self, original_path: Path, post_date: Optional[date] = None) -> Path:
+        """Output path of the processed version of a blog file"""
+        output_filename = f"processed_{original_path.stem}_{post_date or self.target_date}.md"
+        return Path(self.output_dir) / output_filename
+
+    def save_processed_blog(self, original_path: Path, processed_content: Union[str, Iterable[str]],
+                            post_date: Optional[date] = None):
         """
         Save processed blog content to new file
         
+        The content is written to a temporary file next to the output and
+        renamed into place, so readers never see a partial file.
+        
         Args:
             original_path: Original blog file path
-            processed_content: Processed blog content
+            processed_content: Processed blog content, or an iterable of chunks
+            post_date: Date used in the output name, defaults to the target date
         """
-        output_filename = f"processed_{original_path.stem}_{self.target_date}.md"
-        output_path = Path(self.output_dir) / output_filename
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(processed_content)
-        
+        output_path = self.get_output_path(original_path, post_date)
+        if isinstance(processed_content, str):
+            processed_content = [processed_content]
+        write_atomic(output_path, processed_content)
         return output_path
 
     def process_blogs(self):
         """Process all matching blog files"""
-        blog_files = self.get_blog_files()
+        buckets = self.get_blog_files_by_date()
+        self.process_dates({post_date: buckets.get(post_date, []) for post_date in self.get_dates()})
+
+    def process_date(self, post_date: date, blog_files: List[Path]):
+        """Process the blog files of a single date"""
+        self.process_dates({post_date: blog_files})
+
+    def process_dates(self, buckets: Dict[date, List[Path]]):
+        """
+        Process the blog files of several dates
         
-        if not blog_files:
-            print(f"No blog files found for date: {self.target_date}")
-            return
+        Outputs are built in a process pool when jobs > 1. Results are
+        reported and recorded in date and file order whatever order the
+        workers finish in, and a failing file is logged and collected in
+        self.errors without stopping the others.
         
-        for file_path in blog_files:
-            processed_content = self.process_blog(file_path)
-            output_path = self.save_processed_blog(file_path, processed_content)
+        Args:
+            buckets: Blog files to process for each date
+        """
+        tasks = []
+        skipped = Counter()
+        for post_date, blog_files in buckets.items():
+            if not blog_files:
+                print(f"No blog files found for date: {post_date}")
+            
+            for file_path in blog_files:
+                output_path = self.get_output_path(file_path, post_date)
+                digest = None
+                if self.manifest:
+                    is_current, digest = self.manifest.check(file_path, output_path)
+                    if is_current:
+                        skipped[post_date] += 1
+                        continue
+                tasks.append((post_date, file_path, output_path, digest))
+        
+        errors = self._build_outputs([(file_path, output_path) for _, file_path, output_path, _ in tasks])
+        for (post_date, file_path, output_path, digest), error in zip(tasks, errors):
+            if error:
+                print(f"Error processing {file_path}: {error}")
+                self.errors.append((file_path, error))
+                continue
+            
             print(f"Processed {file_path.name} -> {output_path}")
+            if self.manifest:
+                previous_output = self.manifest.record(file_path, output_path, post_date, digest)
+                if previous_output:
+                    self._remove_output(previous_output)
+        
+        if self.manifest:
+            for post_date, blog_files in buckets.items():
+                for stale_output in self.manifest.remove_stale(post_date, blog_files):
+                    self._remove_output(stale_output)
+                if skipped[post_date]:
+                    print(f"Skipped {skipped[post_date]} unchanged blog files for date: {post_date}")
+            self.manifest.save()
+
+    def _build_outputs(self, tasks: List[Tuple[Path, Path]]) -> List[Optional[str]]:
+        """
+        Build (source, output) pairs, serially or in a process pool
+        
+        Sources sharing an output path stay in one unit of work, in order, so
+        the last one wins exactly as in a serial run.
+        
+        Returns:
+            Error message or None for each task, in task order
+        """
+        units: Dict[Path, List[int]] = {}
+        for index, (_, output_path) in enumerate(tasks):
+            units.setdefault(output_path, []).append(index)
+        work = [[tasks[index][0] for index in indexes] for indexes in units.values()]
+        
+        if self.jobs > 1 and len(work) > 1:
+            workers = min(self.jobs, len(work))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_build_output, work, units.keys(),
+                                            chunksize=max(1, len(work) // (workers * 4))))
+        else:
+            results = [_build_output(sources, output_path) for sources, output_path in zip(work, units)]
+        
+        errors = [None] * len(tasks)
+        for indexes, unit_errors in zip(units.values(), results):
+            for index, error in zip(indexes, unit_errors):
+                errors[index] = error
+        return errors
+
+    def watch(self):
+        """
+        Process all matching files, then reprocess affected dates on every
+        change and, when following the calendar, the new date at midnight
+        """
+        if not self.manifest:
+            self.manifest = BuildManifest(
+                os.path.join(self.output_dir, MANIFEST_FILE),
+                self._config_digest()
+            )
+        self.process_blogs()
+        PostWatcher(
+            BLOG_DIR,
+            BLOG_SUBDIRS,
+            self._on_change,
+            debounce=WATCH_CONFIG["debounce"],
+            poll_interval=WATCH_CONFIG["poll_interval"],
+            on_day=self._on_day
+        ).run()
+
+    def _follow_calendar(self, today: date) -> bool:
+        """Move the dates that follow the calendar to today, returning whether any did"""
+        if self._follow_today:
+            self.target_date = self.since = self.until = today
+        elif self._until_today:
+            self.until = today
+        return self._until_today
+
+    def _on_day(self, today: date):
+        """Process the posts of a new date, which no file change may announce"""
+        if self._follow_calendar(today):
+            self.process_blogs()
+
+    def _on_change(self, paths):
+        """Reprocess the dates touched by changed files; unchanged files are skipped"""
+        self._follow_calendar(datetime.now().date())
+        for post_date in sorted(self.post_index.update(paths)):
+            if self.since <= post_date <= self.until:
+                self.process_date(post_date, sorted(post.path for post in self.post_index.posts_on(post_date)))
+
+    def _remove_output(self, output_path: str):
+        """Remove a processed file that is no longer produced"""
+        try:
+            os.remove(output_path)
+            print(f"Removed stale {output_path}")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error removing file {output_path}: {e}")
+
+def _build_output(sources: List[Path], output_path: Path) -> List[Optional[str]]:
+    """
+    Write each source's processed content to output_path in turn
+
+    Runs in worker processes, so errors are returned instead of raised.
+
+    Returns:
+        Error message or None for each source
+    """
+    errors = []
+    for file_path in sources:
+        try:
+            write_atomic(output_path, BlogProcessor.iter_processed_blog(file_path))
+            errors.append(None)
+        except Exception as e:
+            errors.append(str(e))
+    return errors
 
 def main():
     """Main entry point"""
@@ -165,11 +389,31 @@ def main():
     parser = argparse.ArgumentParser(description='Process markdown blog files')
     parser.add_argument('--date', help='Target date in YYYY-MM-DD format')
     parser.add_argument('--output-dir', help='Output directory for processed files')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only rewrite outputs whose source or config changed')
+    parser.add_argument('--since', help='First date of a range in YYYY-MM-DD format')
+    parser.add_argument('--until', help='Last date of a range in YYYY-MM-DD format (defaults to today)')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and process posts as they change (implies --incremental)')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Number of worker processes (default: 1)')
     
     args = parser.parse_args()
+    if args.since:
+        since = datetime.strptime(args.since, '%Y-%m-%d').date()
+        until = datetime.strptime(args.until, '%Y-%m-%d').date() if args.until else datetime.now().date()
+        if since > until:
+            parser.error(f"--since {since} is later than --until {until}")
     
-    processor = BlogProcessor(args.date, args.output_dir)
-    processor.process_blogs()
+    processor = BlogProcessor(args.date, args.output_dir, args.incremental or args.watch,
+                              args.since, args.until, args.jobs)
+    if args.watch:
+        processor.watch()
+    else:
+        processor.process_blogs()
+        if processor.errors:
+            print(f"Failed to process {len(processor.errors)} blog files")
+            sys.exit(1)
 
 if __name__ == '__main__':
     main()
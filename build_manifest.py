@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Build Manifest Module
+
+Tracks what BlogProcessor generated so incremental builds only redo work
+that changed:
+1. Each source path records (mtime, size, digest, date, output path)
+2. A config digest (footer, image settings) invalidates every entry on change
+3. Unchanged sources are detected from a stat call alone
+4. Outputs whose source no longer produces them are reported as stale,
+   unless another source still builds the same output
+"""
+
+import os
+import json
+from datetime import date
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from file_utils import file_digest
+
+
+class BuildManifest:
+    VERSION = 1
+
+    def __init__(self, manifest_file: str, config_digest: str):
+        """
+        Load the manifest
+
+        Args:
+            manifest_file: Path of the manifest JSON file
+            config_digest: Digest of the settings that affect every output
+        """
+        self.manifest_file = manifest_file
+        self.config_digest = config_digest
+        self.entries = self._load()
+        self._dirty = False
+
+    def _load(self) -> dict:
+        """Load entries, dropping them all if the config or version changed"""
+        if not os.path.exists(self.manifest_file):
+            return {}
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error loading manifest {self.manifest_file}: {e}")
+            return {}
+        if data.get('version') != self.VERSION or data.get('config') != self.config_digest:
+            return {}
+        return data.get('entries', {})
+
+    def save(self):
+        """Persist the manifest if it changed"""
+        if not self._dirty:
+            return
+        temp_file = f"{self.manifest_file}.{os.getpid()}.tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': self.VERSION,
+                'config': self.config_digest,
+                'entries': self.entries,
+            }, f, ensure_ascii=False, indent=1)
+        os.replace(temp_file, self.manifest_file)
+        self._dirty = False
+
+    def check(self, source: Path, output: Path) -> Tuple[bool, Optional[str]]:
+        """
+        Check whether output is up to date for source
+
+        The source is only hashed when its mtime or size changed.
+
+        Returns:
+            (is_current, source digest if it had to be computed)
+        """
+        entry = self.entries.get(str(source))
+        if not entry or entry['output'] != str(output) or not output.exists():
+            return False, None
+
+        stat = source.stat()
+        if entry['mtime'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            return True, entry['digest']
+
+        digest = file_digest(source)
+        if digest != entry['digest']:
+            return False, digest
+
+        # Touched but unchanged: remember the new stat so the next run skips hashing
+        entry.update(mtime=stat.st_mtime_ns, size=stat.st_size)
+        self._dirty = True
+        return True, digest
+
+    def record(self, source: Path, output: Path, target_date: date,
+               digest: Optional[str] = None) -> Optional[str]:
+        """
+        Record that source was built into output
+
+        Returns:
+            The source's previous output path if it was different and no
+            other source builds it
+        """
+        previous = self.entries.get(str(source))
+        stat = source.stat()
+        self.entries[str(source)] = {
+            'mtime': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'digest': digest or file_digest(source),
+            'date': target_date.isoformat(),
+            'output': str(output),
+        }
+        self._dirty = True
+        if previous and previous['output'] != str(output):
+            return next(iter(self._unused([previous['output']])), None)
+        return None
+
+    def remove_stale(self, target_date: date, current_sources: Iterable[Path]) -> List[str]:
+        """
+        Forget entries for target_date whose source was not built this run
+
+        Returns:
+            Output paths of the removed entries that no remaining entry uses
+        """
+        current = {str(source) for source in current_sources}
+        stale = [key for key, entry in self.entries.items()
+                 if entry['date'] == target_date.isoformat() and key not in current]
+        outputs = [self.entries.pop(key)['output'] for key in stale]
+        if stale:
+            self._dirty = True
+        return self._unused(outputs)
+
+    def _unused(self, outputs: List[str]) -> List[str]:
+        """The outputs, without duplicates, that no entry points to"""
+        used = {entry['output'] for entry in self.entries.values()}
+        return [output for output in dict.fromkeys(outputs) if output not in used]
@@ -19,10 +19,26 @@ BLOG_SUBDIRS = ["myNotes"]
 # Cache configuration
 CACHE_FILE = "cache.bin"
 
+# Frontmatter index shared by post discovery in all entry points
+INDEX_FILE = "post_index.json"
+
+# Watch mode: quiet period before handling a burst of edits, and the scan
+# interval used when inotify is unavailable
+WATCH_CONFIG = {
+    "debounce": 2.0,
+    "poll_interval": 5.0,
+}
+
 # Base URL for blog and images
 BLOG_BASE_URL = "https://panzhixiang.cn"
 IMAGE_BASE_URL = "https://blog.panzhixiang.cn"
 
+# Local image handling for processed markdown
+IMAGE_CONFIG = {
+    "base_url": IMAGE_BASE_URL,
+    "local_patterns": ["images/", "./images/", "../images/", "/images/"],
+}
+
 
 WECHAT_CONFIG = {
     "APP_ID": os.getenv("WECHAT_APP_ID"),
@@ -58,7 +74,7 @@ MARKDOWN_EXTENSIONS = [
 
 # Markdown extension configurations
 MARKDOWN_EXTENSION_CONFIGS = {
-    'codehilite': {
+    'markdown.extensions.codehilite': {
         'css_class': 'highlight',
         'linenums': False,
         'guess_lang': False
@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+CSS Inliner Module
+
+WeChat drops <style> blocks from articles, so styles must live in style
+attributes:
+1. Compiles a stylesheet once into rules indexed by their rightmost selector
+2. Supports type, class and id selectors joined by descendant combinators
+3. Inlines only the declarations that match each element, in one pass
+   over the HTML, with normal specificity and source order
+4. Removes <style> blocks from the output
+"""
+
+import re
+import html
+import logging
+from html.parser import HTMLParser
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STYLE_BLOCK_RE = re.compile(r'<style\b[^>]*>(.*?)</style\s*>', re.DOTALL | re.IGNORECASE)
+COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+RULE_RE = re.compile(r'([^{}]+)\{([^{}]*)\}')
+COMPOUND_RE = re.compile(r'^(?P<tag>[a-zA-Z][\w-]*|\*)?(?P<rest>(?:[.#][\w-]+)*)$')
+
+# Elements without an end tag never become ancestors
+VOID_ELEMENTS = frozenset((
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'param', 'source', 'track', 'wbr'
+))
+
+
+class Compound(NamedTuple):
+    """A compound selector such as div.highlight"""
+    tag: Optional[str]
+    classes: frozenset
+    ids: frozenset
+
+    def matches(self, tag: str, classes: frozenset, element_id: Optional[str]) -> bool:
+        return ((self.tag is None or self.tag == tag)
+                and self.classes <= classes
+                and (not self.ids or self.ids == {element_id}))
+
+
+class Rule(NamedTuple):
+    """One selector of a CSS rule with its declarations"""
+    compounds: Tuple[Compound, ...]  # outermost first
+    specificity: Tuple[int, int, int]
+    order: int
+    declarations: Tuple[Tuple[str, str], ...]
+
+
+def split_template(template: str) -> Tuple[str, str]:
+    """
+    Separate the <style> blocks from an HTML template
+
+    Returns:
+        (template without style blocks, concatenated stylesheet)
+    """
+    css = '\n'.join(match.group(1) for match in STYLE_BLOCK_RE.finditer(template))
+    return STYLE_BLOCK_RE.sub('', template), css
+
+
+def parse_declarations(text: str) -> List[Tuple[str, str]]:
+    """Parse 'prop: value; ...' into (property, value) pairs"""
+    declarations = []
+    for item in text.split(';'):
+        name, sep, value = item.partition(':')
+        if sep and name.strip() and value.strip():
+            declarations.append((name.strip().lower(), value.strip()))
+    return declarations
+
+
+def _parse_selector(selector: str) -> Optional[Tuple[Compound, ...]]:
+    """Parse a descendant selector, None if it uses unsupported syntax"""
+    compounds = []
+    for part in selector.split():
+        match = COMPOUND_RE.match(part)
+        if not match or not (match.group('tag') or match.group('rest')):
+            return None
+        tag = match.group('tag')
+        names = re.findall(r'[.#][\w-]+', match.group('rest'))
+        compounds.append(Compound(
+            tag.lower() if tag and tag != '*' else None,
+            frozenset(name[1:] for name in names if name[0] == '.'),
+            frozenset(name[1:] for name in names if name[0] == '#')
+        ))
+    return tuple(compounds) or None
+
+
+class CSSInliner:
+    """Stylesheet compiled once and applied to many documents"""
+
+    def __init__(self, css: str):
+        """
+        Compile the stylesheet
+
+        Args:
+            css: Stylesheet text
+        """
+        self.by_class: Dict[str, List[Rule]] = {}
+        self.by_id: Dict[str, List[Rule]] = {}
+        self.by_tag: Dict[str, List[Rule]] = {}
+        self.universal: List[Rule] = []
+
+        order = 0
+        for selectors, body in RULE_RE.findall(COMMENT_RE.sub('', css)):
+            declarations = tuple(parse_declarations(body))
+            if not declarations:
+                continue
+            for selector in selectors.split(','):
+                compounds = _parse_selector(selector.strip())
+                if compounds is None:
+                    logger.debug(f"Skipping unsupported CSS selector: {selector.strip()}")
+                    continue
+                specificity = (
+                    sum(len(c.ids) for c in compounds),
+                    sum(len(c.classes) for c in compounds),
+                    sum(c.tag is not None for c in compounds)
+                )
+                rule = Rule(compounds, specificity, order, declarations)
+                order += 1
+                # Index by the most selective part of the rightmost compound
+                key = compounds[-1]
+                if key.ids:
+                    self.by_id.setdefault(next(iter(key.ids)), []).append(rule)
+                elif key.classes:
+                    self.by_class.setdefault(min(key.classes), []).append(rule)
+                elif key.tag:
+                    self.by_tag.setdefault(key.tag, []).append(rule)
+                else:
+                    self.universal.append(rule)
+
+    def _candidates(self, tag: str, classes: frozenset, element_id: Optional[str]) -> List[Rule]:
+        candidates = list(self.universal)
+        candidates.extend(self.by_tag.get(tag, ()))
+        for name in classes:
+            candidates.extend(self.by_class.get(name, ()))
+        if element_id:
+            candidates.extend(self.by_id.get(element_id, ()))
+        return candidates
+
+    def styles_for(self, tag: str, classes: frozenset, element_id: Optional[str],
+                   ancestors: List[Tuple[str, frozenset, Optional[str]]]) -> List[Tuple[str, str]]:
+        """
+        Declarations that apply to an element, in cascade order
+
+        Args:
+            tag: Element name
+            classes: Element classes
+            element_id: Element id
+            ancestors: (tag, classes, id) of the open ancestors, outermost first
+
+        Returns:
+            (property, value) pairs, later ones overriding earlier ones
+        """
+        matched = []
+        for rule in self._candidates(tag, classes, element_id):
+            if not rule.compounds[-1].matches(tag, classes, element_id):
+                continue
+            # Descendant combinators: match the remaining compounds greedily outward
+            remaining = len(rule.compounds) - 1
+            for ancestor in reversed(ancestors):
+                if not remaining:
+                    break
+                if rule.compounds[remaining - 1].matches(*ancestor):
+                    remaining -= 1
+            if not remaining:
+                matched.append(rule)
+
+        declarations = []
+        for rule in sorted(matched, key=lambda r: (r.specificity, r.order)):
+            declarations.extend(rule.declarations)
+        return declarations
+
+    def inline(self, document: str) -> str:
+        """
+        Inline matching rules into style attributes and drop <style> blocks
+
+        Existing style attributes win over stylesheet rules.
+
+        Args:
+            document: HTML document or fragment
+
+        Returns:
+            HTML with inlined styles
+        """
+        parser = _InliningParser(self)
+        parser.feed(document)
+        parser.close()
+        return ''.join(parser.parts)
+
+
+class _InliningParser(HTMLParser):
+    """Copies HTML through, rewriting start tags that gain styles"""
+
+    def __init__(self, inliner: CSSInliner):
+        super().__init__(convert_charrefs=False)
+        self.inliner = inliner
+        self.parts = []
+        self.stack = []
+        self.in_style = False
+
+    def _start(self, tag: str, attrs: List[Tuple[str, Optional[str]]], self_closing: bool):
+        if tag == 'style':
+            self.in_style = not self_closing
+            return
+
+        values = dict(attrs)
+        classes = frozenset((values.get('class') or '').split())
+        element_id = values.get('id')
+        declarations = self.inliner.styles_for(tag, classes, element_id, self.stack)
+        if declarations:
+            declarations.extend(parse_declarations(values.get('style') or ''))
+            merged = {}
+            for name, value in declarations:
+                merged.pop(name, None)
+                merged[name] = value
+            style = '; '.join(f"{name}: {value}" for name, value in merged.items())
+            attrs = [(name, value) for name, value in attrs if name != 'style'] + [('style', style)]
+            rendered = ''.join(f' {name}' if value is None else f' {name}="{html.escape(value)}"'
+                               for name, value in attrs)
+            self.parts.append(f"<{tag}{rendered}{' /' if self_closing else ''}>")
+        else:
+            self.parts.append(self.get_starttag_text())
+
+        if not self_closing and tag not in VOID_ELEMENTS:
+            self.stack.append((tag, classes, element_id))
+
+    def handle_starttag(self, tag, attrs):
+        self._start(tag, attrs, False)
+
+    def handle_startendtag(self, tag, attrs):
+        self._start(tag, attrs, True)
+
+    def handle_endtag(self, tag):
+        if tag == 'style':
+            self.in_style = False
+            return
+        for index in range(len(self.stack) - 1, -1, -1):
+            if self.stack[index][0] == tag:
+                del self.stack[index:]
+                break
+        self.parts.append(f"</{tag}>")
+
+    def handle_data(self, data):
+        if not self.in_style:
+            self.parts.append(data)
+
+    def handle_entityref(self, name):
+        self.parts.append(f"&{name};")
+
+    def handle_charref(self, name):
+        self.parts.append(f"&#{name};")
+
+    def handle_comment(self, data):
+        self.parts.append(f"<!--{data}-->")
+
+    def handle_decl(self, decl):
+        self.parts.append(f"<!{decl}>")
+
+    def handle_pi(self, data):
+        self.parts.append(f"<?{data}>")
+
+    def unknown_decl(self, data):
+        self.parts.append(f"<![{data}]>")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Default Cover Module
+
+Provides the cover used for posts without images:
+1. The cover is uploaded once and its media_id reused until it expires
+2. Bytes are streamed from memory to the upload, no temporary file
+3. The cover may be a URL or a local file path (no download needed)
+"""
+
+import os
+import hashlib
+import logging
+import threading
+from typing import Optional, Tuple
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class DefaultCover:
+    def __init__(self, client, source: str, image_cache, ttl: int):
+        """
+        Initialize the default cover
+
+        Args:
+            client: WeChatClient used for download and upload
+            source: Cover URL or local file path
+            image_cache: ImageCache storing the uploaded media_id
+            ttl: Seconds the uploaded media_id stays valid
+        """
+        self.client = client
+        self.source = source
+        self.image_cache = image_cache
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    @property
+    def is_remote(self) -> bool:
+        return self.source.startswith(('http://', 'https://'))
+
+    def _filename(self) -> str:
+        """上传时使用的文件名，只保留扩展名以避免编码问题"""
+        path = urlparse(self.source).path if self.is_remote else self.source
+        extension = os.path.splitext(path)[1] or '.jpg'
+        return f"cover{extension}"
+
+    def _read(self) -> bytes:
+        if self.is_remote:
+            return self.client.download(self.source)
+        with open(os.path.expanduser(self.source), 'rb') as f:
+            return f.read()
+
+    def get_media_id(self) -> Optional[str]:
+        """返回默认封面的 media_id，只在缓存缺失或过期时上传"""
+        return self.get_media()[0]
+
+    def get_media(self) -> Tuple[str, float]:
+        """返回默认封面的 (media_id, 过期时间)，只在缓存缺失或过期时上传"""
+        with self._lock:
+            content = None
+            if self.is_remote:
+                # Remote covers are keyed by URL so a cache hit needs no download
+                cache_key = f"default_cover:{self.source}"
+            else:
+                content = self._read()
+                cache_key = hashlib.sha256(content).hexdigest()
+
+            cached = self.image_cache.get(cache_key)
+            if cached:
+                return cached['media_id'], cached['expires_at']
+
+            if content is None:
+                content = self._read()
+            response = self.client.upload_image((self._filename(), content))
+            expires_at = self.image_cache.set(
+                cache_key, {"media_id": response['media_id'], "url": response.get('url')}, self.ttl
+            )
+            logger.info(f"Uploaded default cover {self.source}")
+            return response['media_id'], expires_at
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+File Utilities Module
+
+File helpers shared by the publisher and the processor:
+1. SHA-256 digests of file contents, read in chunks
+2. An exclusive lock shared between processes, held on a side lock file
+"""
+
+import hashlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows: the lock only serializes within a process
+    fcntl = None
+
+
+def file_digest(file_path: Union[str, Path]) -> str:
+    """SHA-256 of a file's bytes"""
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+@contextmanager
+def file_lock(file_path: Union[str, Path]) -> Iterator[None]:
+    """
+    Hold an exclusive lock on file_path + ".lock" for the duration of the block
+
+    Callers still need a threading lock: without fcntl this does nothing.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(f"{file_path}.lock", 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
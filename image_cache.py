@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Image Cache Module
+
+SQLite-backed cache of uploaded WeChat media:
+1. One row per entry, so inserts are O(1) instead of rewriting the whole file
+2. WAL mode and a busy timeout make it safe to share between concurrent runs
+3. Entries carry an expiry; expired, too old or excess entries are evicted
+4. The legacy pickle cache (cache.bin) is migrated once on first open
+"""
+
+import os
+import json
+import time
+import pickle
+import sqlite3
+import logging
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ImageCache:
+    def __init__(self, db_file: str, legacy_file: Optional[str] = None,
+                 max_entries: Optional[int] = None, max_age: Optional[int] = None):
+        """
+        Open (and create if needed) the cache database
+
+        Args:
+            db_file: Path to the SQLite database
+            legacy_file: Optional pickle cache to migrate from
+            max_entries: Keep at most this many of the newest entries
+            max_age: Evict entries created more than this many seconds ago
+        """
+        self.db_file = db_file
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS image_cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+        if legacy_file and os.path.exists(legacy_file):
+            self._migrate(legacy_file)
+        self.evict()
+
+    def _migrate(self, legacy_file: str):
+        """把旧的 pickle 缓存导入数据库，然后重命名旧文件"""
+        try:
+            with open(legacy_file, 'rb') as f:
+                legacy = pickle.load(f)
+        except Exception as e:
+            logger.error(f"Error loading legacy cache {legacy_file}: {str(e)}")
+            return
+        if not isinstance(legacy, dict):
+            # Nothing to import, but renaming it stops the check on every start
+            logger.error(f"Ignoring legacy cache {legacy_file}: expected a dict, got {type(legacy).__name__}")
+            legacy = {}
+
+        now = time.time()
+        rows = []
+        for key, entry in legacy.items():
+            # Entries without an expiry predate content-hash keys and are useless
+            if isinstance(entry, dict) and entry.get('expires_at', 0) > now:
+                value = {k: v for k, v in entry.items() if k != 'expires_at'}
+                rows.append((key, json.dumps(value), now, entry['expires_at']))
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO image_cache (key, value, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+        os.replace(legacy_file, f"{legacy_file}.migrated")
+        logger.info(f"Migrated {len(rows)} entries from {legacy_file}")
+
+    def get(self, key: str) -> Optional[dict]:
+        """获取缓存，过期的条目视为不存在；返回值带有该条目的 expires_at"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM image_cache WHERE key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+        return dict(json.loads(row[0]), expires_at=row[1]) if row else None
+
+    def set(self, key: str, value: dict, ttl: int) -> float:
+        """设置缓存，ttl 秒后过期，返回过期时间"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO image_cache (key, value, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now + ttl)
+            )
+            self._conn.commit()
+        return now + ttl
+
+    def evict(self):
+        """删除过期、过旧以及超出数量上限的条目"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM image_cache WHERE expires_at <= ?", (now,))
+            if self.max_age:
+                self._conn.execute("DELETE FROM image_cache WHERE created_at < ?", (now - self.max_age,))
+            if self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM image_cache WHERE key NOT IN"
+                    " (SELECT key FROM image_cache ORDER BY created_at DESC LIMIT ?)",
+                    (self.max_entries,)
+                )
+            self._conn.commit()
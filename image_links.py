@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Image Links Module
+
+Single-pass scanner for image references in markdown, shared by
+BlogProcessor and WeChatPublisher:
+1. Fenced and indented code blocks and inline code spans are skipped;
+   like all inline markup, a code span never crosses a blank line
+2. Finds inline images ![alt](path "title"), <img src="path"> tags and
+   reference-style images ![alt][id] with their [id]: path definitions
+3. Returns structured references (kind, span, alt, path, title)
+4. Rewrites image paths in one pass, linear in the size of the document
+5. Can rewrite a stream of lines block by block in constant memory
+"""
+
+import re
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+# Opening/closing line of a fenced code block; the info string of a
+# backtick fence cannot contain backticks ("```ls``` x" is a code span)
+FENCE_RE = re.compile(r'^ {0,3}(`{3,}(?=[^`]*$)|~{3,})')
+
+# Line of an indented code block (or of an indented list continuation)
+INDENTED_RE = re.compile(r'^(?: {4}| {0,3}\t)')
+
+# First line of a list item
+LIST_ITEM_RE = re.compile(r'^ {0,3}(?:[*+-]|\d{1,9}[.)])(?:[ \t]|$)')
+
+# Inline tokens; code spans come first so images inside them are skipped.
+# An inline image destination is either <...> or everything up to the
+# closing parenthesis with an optional quoted title, as in Python-Markdown.
+INLINE_RE = re.compile(r'''
+    (?P<code>(?<!`)(?P<ticks>`+)(?!`).+?(?<!`)(?P=ticks)(?!`))
+  | (?P<inline>!\[(?P<alt>[^\]]*)\]\(
+        [ \t]*(?:<(?P<angle_path>[^>\n]*)>|(?P<path>[^)\s<][^)\n]*?))
+        (?:\s+(?:"(?P<title_dq>[^"]*)"|'(?P<title_sq>[^']*)'))?
+    [ \t]*\))
+  | (?P<reference>!\[(?P<ref_alt>[^\]]*)\]\[(?P<ref_id>[^\]]*)\])
+  | (?P<html><img\b[^>]*?\bsrc=(?P<quote>["'])(?P<src>.*?)(?P=quote)[^>]*>)
+  | (?P<definition>^[ ]{0,3}\[(?P<def_id>[^\]]+)\]:[ \t]*<?(?P<def_path>[^\s>]+)>?
+        (?:[ \t]+(?:"(?P<def_title_dq>[^"]*)"|'(?P<def_title_sq>[^']*)'|\((?P<def_title_paren>[^)]*)\)))?
+    [ \t]*$)
+''', re.VERBOSE | re.DOTALL | re.MULTILINE)
+
+LINE_RE = re.compile(r'[^\n]*\n|[^\n]+')
+
+
+class ImageRef(NamedTuple):
+    """An image found in markdown content"""
+    kind: str  # 'inline', 'reference' or 'html'
+    span: Tuple[int, int]  # span of the path; for 'reference' it lies in the definition
+    alt: str
+    path: str
+    title: Optional[str]
+
+
+def _normalize_label(label: str) -> str:
+    """Reference labels match case-insensitively with collapsed whitespace"""
+    return ' '.join(label.lower().split())
+
+
+def _closes_fence(line: str, fence: str) -> bool:
+    """Whether line closes a code block opened with fence"""
+    match = FENCE_RE.match(line)
+    return bool(match) and match.group(1)[0] == fence[0] \
+        and len(match.group(1)) >= len(fence) and not line.strip().strip(fence[0])
+
+
+def _split_lines(content: str) -> Iterator[str]:
+    """Lines of content with their endings, split like a text file read"""
+    return (match.group() for match in LINE_RE.finditer(content))
+
+
+def _inline_path_group(match: re.Match) -> str:
+    """Group holding the destination of an inline image match"""
+    return 'path' if match.group('path') is not None else 'angle_path'
+
+
+def iter_blocks(lines: Iterable[str]) -> Iterator[Tuple[str, bool]]:
+    """
+    Split lines into code and blank-line separated text blocks
+
+    Inline markup never crosses a blank line, so each text block can be
+    scanned on its own. Code, fenced or indented, is passed through line
+    by line, so a long listing is never held in memory. A block indented
+    by four spaces is code unless it continues a list item.
+
+    Yields:
+        (chunk, is_code); each text block is one chunk
+    """
+    block = []
+    fence = None
+    indented = False
+    in_list = False
+    for line in lines:
+        if fence is not None:
+            if _closes_fence(line, fence):
+                fence = None
+            yield line, True
+            continue
+
+        if indented:
+            if not line.strip() or INDENTED_RE.match(line):
+                yield line, True
+                continue
+            indented = False
+
+        match = FENCE_RE.match(line)
+        if match:
+            if block:
+                yield ''.join(block), False
+                block = []
+            fence = match.group(1)
+            in_list = False
+            yield line, True
+        elif not block and line.strip() and INDENTED_RE.match(line) and not in_list:
+            # Indented code cannot interrupt a paragraph, only start a block
+            indented = True
+            yield line, True
+        else:
+            if not block and line.strip() and not INDENTED_RE.match(line):
+                in_list = bool(LIST_ITEM_RE.match(line))
+            block.append(line)
+            if not line.strip():
+                yield ''.join(block), False
+                block = []
+
+    if block:
+        yield ''.join(block), False
+
+
+def iter_segments(content: str) -> Iterator[Tuple[int, int, bool]]:
+    """
+    Split content into the chunks of iter_blocks
+
+    An unclosed fence runs to the end of the document.
+
+    Yields:
+        (start, end, is_code) spans covering the whole content
+    """
+    position = 0
+    for chunk, is_code in iter_blocks(_split_lines(content)):
+        yield position, position + len(chunk), is_code
+        position += len(chunk)
+
+
+def scan_images(content: str) -> List[ImageRef]:
+    """
+    Find every image in markdown content
+
+    Args:
+        content: Markdown content
+
+    Returns:
+        Image references in document order. Reference-style images whose
+        label has no definition are omitted.
+    """
+    found = []
+    definitions = {}
+    for start, end, is_code in iter_segments(content):
+        if is_code:
+            continue
+        for match in INLINE_RE.finditer(content, start, end):
+            kind = match.lastgroup
+            if kind == 'inline':
+                title = match.group('title_dq')
+                if title is None:
+                    title = match.group('title_sq')
+                group = _inline_path_group(match)
+                found.append(ImageRef('inline', match.span(group), match.group('alt'),
+                                      match.group(group), title))
+            elif kind == 'html':
+                found.append(ImageRef('html', match.span('src'), '', match.group('src'), None))
+            elif kind == 'reference':
+                label = match.group('ref_id') or match.group('ref_alt')
+                found.append((_normalize_label(label), match.group('ref_alt')))
+            elif kind == 'definition':
+                # The first definition of a label wins
+                label = _normalize_label(match.group('def_id'))
+                if label not in definitions:
+                    title = next((match.group(name) for name in
+                                  ('def_title_dq', 'def_title_sq', 'def_title_paren')
+                                  if match.group(name) is not None), None)
+                    definitions[label] = (match.span('def_path'), match.group('def_path'), title)
+
+    images = []
+    for item in found:
+        if isinstance(item, ImageRef):
+            images.append(item)
+        elif item[0] in definitions:
+            span, path, title = definitions[item[0]]
+            images.append(ImageRef('reference', span, item[1], path, title))
+    return images
+
+
+def rewrite_images(content: str, replace: Callable[[str], Optional[str]]) -> str:
+    """
+    Rewrite the path of every image in one pass
+
+    Shares its implementation with rewrite_images_stream, so both give the
+    same output.
+
+    Args:
+        content: Markdown content
+        replace: Called with each image path, returns the new path or None
+            to keep it
+
+    Returns:
+        Content with image paths rewritten
+    """
+    image_labels = collect_image_labels(_split_lines(content))
+    return ''.join(rewrite_images_stream(_split_lines(content), replace, image_labels))
+
+
+def collect_image_labels(lines: Iterable[str]) -> Set[str]:
+    """Labels used by reference-style images, gathered in one streaming pass"""
+    labels = set()
+    for block, is_code in iter_blocks(lines):
+        if is_code:
+            continue
+        for match in INLINE_RE.finditer(block):
+            if match.lastgroup == 'reference':
+                labels.add(_normalize_label(match.group('ref_id') or match.group('ref_alt')))
+    return labels
+
+
+def _rewrite_block(block: str, replace: Callable[[str], Optional[str]],
+                   image_labels: Set[str], defined: Set[str]) -> str:
+    """Rewrite the image paths of one text block"""
+    parts = []
+    position = 0
+    for match in INLINE_RE.finditer(block):
+        kind = match.lastgroup
+        if kind == 'inline':
+            group = _inline_path_group(match)
+        elif kind == 'html':
+            group = 'src'
+        elif kind == 'definition':
+            # Only the first definition of a label used by images
+            label = _normalize_label(match.group('def_id'))
+            if label not in image_labels or label in defined:
+                continue
+            defined.add(label)
+            group = 'def_path'
+        else:
+            continue
+        new_path = replace(match.group(group))
+        if new_path is None:
+            continue
+        parts.append(block[position:match.start(group)])
+        parts.append(new_path)
+        position = match.end(group)
+    parts.append(block[position:])
+    return ''.join(parts)
+
+
+def rewrite_images_stream(lines: Iterable[str], replace: Callable[[str], Optional[str]],
+                          image_labels: Optional[Set[str]] = None) -> Iterator[str]:
+    """
+    Rewrite image paths of a stream of lines, one block at a time
+
+    Args:
+        lines: Markdown lines, with line endings
+        replace: Called with each image path, returns the new path or None
+            to keep it
+        image_labels: Reference labels used by images (see
+            collect_image_labels); their definitions are rewritten too
+
+    Yields:
+        Rewritten chunks of the document
+    """
+    image_labels = image_labels or set()
+    defined = set()
+    for block, is_code in iter_blocks(lines):
+        yield block if is_code else _rewrite_block(block, replace, image_labels, defined)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Image Optimizer Module
+
+Optional client-side image optimization before upload:
+1. Applies the EXIF orientation, then resizes images wider than a
+   maximum width
+2. Recompresses JPEG/PNG and strips metadata (EXIF etc.)
+3. Caches results by source content hash so each image is transformed once
+4. Runs the CPU-heavy encoding in a process pool
+
+Requires Pillow; without it the optimizer is disabled and images are
+uploaded unchanged.
+"""
+
+import os
+import shutil
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_FORMATS = ('JPEG', 'PNG')
+
+# Part of the cache key; bump when the output of optimize_image changes
+OPTIMIZE_VERSION = 2
+
+
+def optimize_image(source: str, target: str, max_width: int, quality: int) -> Tuple[int, int]:
+    """
+    Write an optimized copy of source to target
+
+    The smaller of the optimized and the original bytes is kept, so the
+    result is never larger than the source. Animated or unsupported formats
+    are copied unchanged.
+
+    Returns:
+        (source size, target size) in bytes
+    """
+    source_size = os.path.getsize(source)
+    temp_target = f"{target}.{os.getpid()}.tmp"
+
+    with Image.open(source) as img:
+        image_format = img.format
+        if image_format not in SUPPORTED_FORMATS or getattr(img, 'is_animated', False):
+            shutil.copyfile(source, temp_target)
+        else:
+            # The EXIF orientation is dropped with the metadata, so apply it first
+            img = ImageOps.exif_transpose(img)
+            if img.width > max_width:
+                height = round(img.height * max_width / img.width)
+                img = img.resize((max_width, height), Image.LANCZOS)
+            # Saving without exif/info drops the metadata
+            if image_format == 'JPEG':
+                img.convert('RGB').save(temp_target, 'JPEG', quality=quality, optimize=True, progressive=True)
+            else:
+                img.save(temp_target, 'PNG', optimize=True)
+
+    if os.path.getsize(temp_target) >= source_size:
+        shutil.copyfile(source, temp_target)
+    os.replace(temp_target, target)
+    return source_size, os.path.getsize(target)
+
+
+class ImageOptimizer:
+    def __init__(self, cache_dir: str, max_width: int = 1080, quality: int = 85,
+                 workers: Optional[int] = None):
+        """
+        Initialize the optimizer
+
+        Args:
+            cache_dir: Directory holding optimized images
+            max_width: Images wider than this are resized
+            quality: JPEG quality used for recompression
+            workers: Process pool size, defaults to the CPU count
+        """
+        self.cache_dir = cache_dir
+        self.max_width = max_width
+        self.quality = quality
+        self.workers = workers
+        self.bytes_before = 0
+        self.bytes_after = 0
+        self._executor = None
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @property
+    def available(self) -> bool:
+        return Image is not None
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def _target_path(self, digest: str, source: Path) -> Path:
+        """优化结果的缓存路径，包含参数以便配置变化后重新生成"""
+        return Path(self.cache_dir) / f"{digest}-v{OPTIMIZE_VERSION}-w{self.max_width}-q{self.quality}{source.suffix.lower()}"
+
+    def optimize(self, images: List[Tuple[str, Path]]) -> List[Path]:
+        """
+        Optimize images, reusing cached results
+
+        Args:
+            images: [(content digest, source path)]
+
+        Returns:
+            Path to upload for each image, in input order
+        """
+        results = []
+        pending = {}
+        for digest, source in images:
+            target = self._target_path(digest, source)
+            results.append(target)
+            if target.exists():
+                self._record(os.path.getsize(source), os.path.getsize(target))
+            else:
+                pending.setdefault(target, source)
+
+        if pending:
+            futures = {
+                target: self._get_executor().submit(
+                    optimize_image, str(source), str(target), self.max_width, self.quality
+                )
+                for target, source in pending.items()
+            }
+            for target, future in futures.items():
+                try:
+                    self._record(*future.result())
+                except Exception as e:
+                    logger.error(f"Error optimizing image {pending[target]}: {str(e)}")
+
+        # Fall back to the original when optimization failed
+        return [target if target.exists() else source
+                for target, (_, source) in zip(results, images)]
+
+    def _record(self, size_before: int, size_after: int):
+        with self._lock:
+            self.bytes_before += size_before
+            self.bytes_after += size_after
+
+    def reset_stats(self):
+        with self._lock:
+            self.bytes_before = 0
+            self.bytes_after = 0
+
+    def shutdown(self):
+        """关闭进程池"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Post Index Module
+
+Keeps an on-disk index of blog post frontmatter so post discovery does not
+re-parse every markdown file on every run:
+1. Entries are keyed by path and store (mtime, size, date, title)
+2. Unchanged files are answered from the index without being opened
+3. New or modified files have only their frontmatter block read and parsed
+4. Entries for deleted files are pruned on the next scan
+5. Post bodies can be streamed line by line without the frontmatter
+"""
+
+import os
+import re
+import itertools
+import json
+import logging
+from datetime import datetime, date
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set
+import yaml
+import frontmatter
+from frontmatter.default_handlers import SafeLoader
+from dateutil import parser
+
+logger = logging.getLogger(__name__)
+
+# Same delimiter rule python-frontmatter uses for YAML headers
+FRONTMATTER_BOUNDARY = re.compile(r'^-{3,}\s*$')
+
+# Headers larger than this are handed to the full parser
+MAX_HEADER_BYTES = 64 * 1024
+
+
+class IndexedPost(NamedTuple):
+    """A blog post as seen by the index"""
+    path: Path
+    date: Optional[date]
+    title: Optional[str]
+
+
+def parse_post_date(date_value) -> Optional[date]:
+    """Normalize a frontmatter date value to a date object"""
+    if not date_value:
+        return None
+
+    if isinstance(date_value, datetime):
+        return date_value.date()
+    elif isinstance(date_value, date):
+        return date_value
+    elif isinstance(date_value, str):
+        try:
+            return parser.parse(date_value).date()
+        except Exception as e:
+            logger.error(f"Error parsing date {date_value}: {str(e)}")
+            return None
+    return None
+
+
+def read_frontmatter(path: Path) -> dict:
+    """
+    Read only the leading YAML frontmatter block of a markdown file
+
+    The file is read line by line and reading stops at the closing ``---``
+    delimiter, so the size of the post body does not matter. Anything that
+    is not a plain YAML header (TOML/JSON headers, leading blank lines, an
+    unterminated or oversized header) falls back to ``frontmatter.load``.
+
+    Args:
+        path: Path to the markdown file
+
+    Returns:
+        Frontmatter metadata, empty if the file has none
+    """
+    with open(path, 'rb') as f:
+        first_line = f.readline(MAX_HEADER_BYTES).decode('utf-8-sig')
+        if not FRONTMATTER_BOUNDARY.match(first_line):
+            stripped = first_line.lstrip()
+            if not stripped or stripped.startswith(('---', '+++', '{')):
+                return frontmatter.load(path).metadata
+            return {}
+
+        header_lines = []
+        header_size = 0
+        for line in iter(lambda: f.readline(MAX_HEADER_BYTES), b''):
+            header_size += len(line)
+            if header_size > MAX_HEADER_BYTES:
+                break
+            line = line.decode('utf-8')
+            if FRONTMATTER_BOUNDARY.match(line):
+                metadata = yaml.load(''.join(header_lines), Loader=SafeLoader)
+                return metadata if isinstance(metadata, dict) else {}
+            header_lines.append(line)
+
+    return frontmatter.load(path).metadata
+
+
+def iter_post_body(path: Path) -> Iterator[str]:
+    """
+    Stream the body of a markdown file without its YAML frontmatter
+
+    Yields the same text as ``frontmatter.load(path).content`` (surrounding
+    whitespace stripped) line by line, so memory does not grow with the
+    size of the post. TOML/JSON headers fall back to ``frontmatter.load``.
+
+    Args:
+        path: Path to the markdown file
+
+    Yields:
+        Body lines with their line endings; the last one has none
+    """
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        lines = iter(f)
+        first_line = next((line for line in lines if line.strip()), None)
+        if first_line is None:
+            return
+
+        stripped = first_line.lstrip()
+        if FRONTMATTER_BOUNDARY.match(stripped):
+            header_lines = [first_line]
+            for line in lines:
+                header_lines.append(line)
+                if FRONTMATTER_BOUNDARY.match(line):
+                    body = lines
+                    break
+            else:
+                # Unterminated header: the whole file is content
+                body = iter(header_lines)
+        elif stripped.startswith(('+++', '{')):
+            body = iter(frontmatter.load(path).content.splitlines(keepends=True))
+        else:
+            body = itertools.chain([first_line], lines)
+
+        # Hold back blank lines and the last line to strip trailing whitespace
+        held = None
+        blank_lines = []
+        for line in body:
+            if not line.strip():
+                blank_lines.append(line)
+                continue
+            if held is None:
+                line = line.lstrip()
+            else:
+                yield held
+                yield from blank_lines
+            held, blank_lines = line, []
+        if held is not None:
+            yield held.rstrip()
+
+
+class PostIndex:
+    """Incrementally maintained frontmatter index shared by all entry points"""
+
+    VERSION = 1
+
+    def __init__(self, index_file: str):
+        self.index_file = index_file
+        self.entries = self._load_index()
+        self._dirty = False
+
+    def _load_index(self) -> Dict[str, dict]:
+        """Load the index, discarding it if unreadable or from another version"""
+        if not os.path.exists(self.index_file):
+            return {}
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION:
+                return data.get('entries', {})
+        except Exception as e:
+            logger.error(f"Error loading post index: {str(e)}")
+        return {}
+
+    def save(self):
+        """Persist the index if it changed, replacing the old file atomically"""
+        if not self._dirty:
+            return
+        # Both entry points and their watch daemons share the index file
+        temp_file = f"{self.index_file}.{os.getpid()}.tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({'version': self.VERSION, 'entries': self.entries}, f, ensure_ascii=False)
+            os.replace(temp_file, self.index_file)
+            self._dirty = False
+        except Exception as e:
+            logger.error(f"Error saving post index: {str(e)}")
+
+    def _parse_entry(self, path: Path, stat: os.stat_result) -> dict:
+        """Parse the frontmatter of a file into a fresh index entry"""
+        post_date, title = None, None
+        try:
+            metadata = read_frontmatter(path)
+            post_date = parse_post_date(metadata.get('date'))
+            title = metadata.get('title')
+        except Exception as e:
+            logger.error(f"Error processing {path}: {str(e)}")
+
+        return {
+            'mtime': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'date': post_date.isoformat() if post_date else None,
+            'title': str(title) if title is not None else None,
+        }
+
+    def lookup(self, path: Path) -> Optional[IndexedPost]:
+        """Return the indexed post for path, parsing it only if it changed"""
+        key = str(path)
+        try:
+            stat = path.stat()
+        except OSError:
+            if self.entries.pop(key, None) is not None:
+                self._dirty = True
+            return None
+
+        entry = self.entries.get(key)
+        if not entry or entry['mtime'] != stat.st_mtime_ns or entry['size'] != stat.st_size:
+            entry = self._parse_entry(path, stat)
+            self.entries[key] = entry
+            self._dirty = True
+
+        post_date = date.fromisoformat(entry['date']) if entry['date'] else None
+        return IndexedPost(path, post_date, entry['title'])
+
+    def scan(self, blog_dir: str, subdirs: List[str]) -> List[IndexedPost]:
+        """
+        Walk all configured blog subdirectories and return their posts
+
+        Args:
+            blog_dir: Root blog directory
+            subdirs: Subdirectories of blog_dir to scan
+
+        Returns:
+            Indexed posts for every markdown file found
+        """
+        posts = []
+        seen = set()
+        roots = []
+        for subdir in subdirs:
+            blog_path = Path(blog_dir) / subdir
+            if not blog_path.exists():
+                continue
+            roots.append(str(blog_path) + os.sep)
+
+            for file in blog_path.glob('**/*.md'):
+                post = self.lookup(file)
+                if post:
+                    seen.add(str(file))
+                    posts.append(post)
+
+        # Drop entries for files that disappeared from the scanned trees
+        stale = [key for key in self.entries
+                 if key not in seen and key.startswith(tuple(roots))]
+        for key in stale:
+            del self.entries[key]
+        if stale:
+            self._dirty = True
+
+        self.save()
+        return posts
+
+    def update(self, paths: Iterable[Path]) -> Set[date]:
+        """
+        Refresh the entries of changed paths without scanning the trees
+
+        Args:
+            paths: Markdown files that were created, modified or deleted
+
+        Returns:
+            Dates affected by the changes, both before and after
+        """
+        affected = set()
+        for path in paths:
+            entry = self.entries.get(str(path))
+            if entry and entry['date']:
+                affected.add(date.fromisoformat(entry['date']))
+            post = self.lookup(Path(path))
+            if post and post.date:
+                affected.add(post.date)
+        self.save()
+        return affected
+
+    def posts_on(self, post_date: date) -> List[IndexedPost]:
+        """Indexed posts dated post_date, answered from memory"""
+        target = post_date.isoformat()
+        return [IndexedPost(Path(key), post_date, entry['title'])
+                for key, entry in sorted(self.entries.items()) if entry['date'] == target]
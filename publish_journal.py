@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Publish Journal Module
+
+SQLite-backed journal of per-post publishing progress:
+1. Each post records the last completed stage and the data it produced
+   (image mappings, cover media_id, rendered article, draft media_id)
+2. Entries are tied to the post's content hash; editing a post starts over
+3. Reruns resume from the last completed stage instead of redoing uploads
+4. Posts whose current content was already published can be skipped
+5. Posts discovered but not yet published can be picked up by a later run
+"""
+
+import json
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+STAGE_DISCOVERED = 'discovered'
+STAGE_IMAGES_UPLOADED = 'images_uploaded'
+STAGE_RENDERED = 'rendered'
+STAGE_DRAFT_CREATED = 'draft_created'
+
+# In pipeline order
+STAGES = (STAGE_DISCOVERED, STAGE_IMAGES_UPLOADED, STAGE_RENDERED, STAGE_DRAFT_CREATED)
+
+
+class JournalEntry(NamedTuple):
+    """Progress of one post"""
+    content_hash: str
+    stage: str
+    data: dict
+    updated_at: float
+
+    def reached(self, stage: str) -> bool:
+        """Whether stage (or a later one) has been completed"""
+        return STAGES.index(self.stage) >= STAGES.index(stage)
+
+
+class PublishJournal:
+    def __init__(self, db_file: str):
+        """
+        Open (and create if needed) the journal database
+
+        Args:
+            db_file: Path to the SQLite database
+        """
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS publish_journal ("
+            " path TEXT PRIMARY KEY,"
+            " content_hash TEXT NOT NULL,"
+            " stage TEXT NOT NULL,"
+            " data TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, post_path: Path, content_hash: str) -> Optional[JournalEntry]:
+        """获取文章的进度；内容已变化时视为不存在"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash, stage, data, updated_at FROM publish_journal"
+                " WHERE path = ? AND content_hash = ?",
+                (str(post_path), content_hash)
+            ).fetchone()
+        if not row:
+            return None
+        return JournalEntry(row[0], row[1], json.loads(row[2]), row[3])
+
+    def record(self, post_path: Path, content_hash: str, stage: str, **data) -> JournalEntry:
+        """
+        Record that a post completed stage
+
+        Data from earlier stages of the same content is kept and updated
+        with the new values; a different content hash starts a new entry.
+
+        Returns:
+            The updated entry
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash, data FROM publish_journal WHERE path = ?",
+                (str(post_path),)
+            ).fetchone()
+            merged = json.loads(row[1]) if row and row[0] == content_hash else {}
+            merged.update(data)
+            now = time.time()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO publish_journal (path, content_hash, stage, data, updated_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (str(post_path), content_hash, stage, json.dumps(merged, ensure_ascii=False), now)
+            )
+            self._conn.commit()
+        return JournalEntry(content_hash, stage, merged, now)
+
+    def unfinished(self) -> List[Path]:
+        """尚未创建草稿（被推迟或失败）的文章，最早记录的在前"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path FROM publish_journal WHERE stage != ? ORDER BY updated_at",
+                (STAGE_DRAFT_CREATED,)
+            ).fetchall()
+        return [Path(row[0]) for row in rows]
+
+    def forget(self, post_path: Path):
+        """删除文章的进度，下次从头开始"""
+        with self._lock:
+            self._conn.execute("DELETE FROM publish_journal WHERE path = ?", (str(post_path),))
+            self._conn.commit()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Rate Limiter Module
+
+Client-side pacing and quota accounting for WeChat API calls:
+1. Thread-safe token bucket pacing calls, shared by every worker of a run
+2. One bucket per API family (media upload, news upload, token, ...)
+3. Daily call counters per family, persisted to disk and shared between
+   processes, so quota use survives restarts
+4. Callers can check the remaining quota before starting a batch
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from datetime import date
+from typing import Dict, Optional
+
+from file_utils import file_lock
+
+logger = logging.getLogger(__name__)
+
+
+class QuotaExceeded(Exception):
+    """今日接口调用次数已用完"""
+    pass
+
+
+class RateLimiter:
+    """Token bucket allowing `rate` calls per second with bursts up to `burst`"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        """Add the tokens earned since the last refill"""
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def acquire(self):
+        """Block until a call may be made"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class DailyQuota:
+    """Per-family call counters for the current day, persisted in a JSON file"""
+
+    def __init__(self, state_file: str, limits: Dict[str, Optional[int]]):
+        """
+        Args:
+            state_file: Path of the counter file
+            limits: Daily call limit per family, None for unlimited
+        """
+        self.state_file = state_file
+        self.limits = limits
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, int]:
+        """读取今天的计数，日期变化后从零开始"""
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.error(f"Error loading quota counters: {str(e)}")
+            return {}
+        if data.get('date') != date.today().isoformat():
+            return {}
+        return data.get('counts', {})
+
+    def _save(self, counts: Dict[str, int]):
+        temp_file = f"{self.state_file}.{os.getpid()}.tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({'date': date.today().isoformat(), 'counts': counts}, f)
+            os.replace(temp_file, self.state_file)
+        except OSError as e:
+            logger.error(f"Error saving quota counters: {str(e)}")
+
+    def used(self, family: str) -> int:
+        with self._lock, file_lock(self.state_file):
+            return self._load().get(family, 0)
+
+    def remaining(self, family: str) -> Optional[int]:
+        """今天剩余的调用次数，不限制时返回 None"""
+        limit = self.limits.get(family)
+        if limit is None:
+            return None
+        return max(0, limit - self.used(family))
+
+    def consume(self, family: str):
+        """
+        Count one call
+
+        Raises:
+            QuotaExceeded: The family's daily limit has been reached
+        """
+        limit = self.limits.get(family)
+        with self._lock, file_lock(self.state_file):
+            counts = self._load()
+            used = counts.get(family, 0)
+            if limit is not None and used >= limit:
+                raise QuotaExceeded(f"Daily quota of {limit} {family} calls used up")
+            counts[family] = used + 1
+            self._save(counts)
+
+
+class ApiLimiter:
+    """Per-family pacing plus daily quota accounting"""
+
+    def __init__(self, families: Dict[str, dict], state_file: str):
+        """
+        Args:
+            families: {family: {"rate", "burst", "daily"}}; "daily" may be None
+            state_file: Path of the persisted daily counters
+        """
+        self.buckets = {
+            family: RateLimiter(config["rate"], config.get("burst", 1))
+            for family, config in families.items()
+        }
+        self.quota = DailyQuota(state_file, {
+            family: config.get("daily") for family, config in families.items()
+        })
+
+    def acquire(self, family: Optional[str]):
+        """
+        Wait for the family's bucket and count the call
+
+        Unknown families (None included) are neither paced nor counted.
+
+        Raises:
+            QuotaExceeded: The family's daily limit has been reached
+        """
+        bucket = self.buckets.get(family)
+        if bucket is None:
+            return
+        self.quota.consume(family)
+        bucket.acquire()
+
+    def remaining(self, family: str) -> Optional[int]:
+        return self.quota.remaining(family)
+
+    def shortfall(self, needed: Dict[str, int]) -> Dict[str, int]:
+        """
+        Calls missing from today's quota to make the needed calls
+
+        Returns:
+            {family: missing calls}, empty if everything fits
+        """
+        missing = {}
+        for family, count in needed.items():
+            remaining = self.remaining(family)
+            if remaining is not None and count > remaining:
+                missing[family] = count - remaining
+        return missing
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Renderer Module
+
+Renders markdown posts to the HTML sent to WeChat:
+1. Builds the markdown extension pipeline once and resets it between posts
+2. Caches Pygments lexers looked up by codehilite
+3. Wraps the rendered body in the configured HTML template
+4. Optionally caches the final HTML on disk, keyed by source and
+   configuration; entries unused for too long or beyond a size budget
+   are evicted
+5. Optionally inlines the template stylesheet, since WeChat strips <style>
+"""
+
+import os
+import json
+import hashlib
+import time
+import logging
+import threading
+from typing import Dict, List, Optional
+import markdown
+import pygments
+from markdown.extensions import codehilite
+from css_inliner import CSSInliner, split_template
+
+logger = logging.getLogger(__name__)
+
+# Cache writes between two evictions in long-running processes
+EVICT_INTERVAL = 100
+
+_lexer_cache = {}
+_lexer_cache_lock = threading.Lock()
+_get_lexer_by_name = getattr(codehilite, 'get_lexer_by_name', None)
+
+
+def _cached_get_lexer_by_name(alias: str, **options):
+    """Return a shared lexer instance for (alias, options)"""
+    try:
+        key = (alias, tuple(sorted((name, repr(value)) for name, value in options.items())))
+    except TypeError:
+        return _get_lexer_by_name(alias, **options)
+
+    lexer = _lexer_cache.get(key)
+    if lexer is None:
+        # ClassNotFound propagates so codehilite can fall back to plain text
+        lexer = _get_lexer_by_name(alias, **options)
+        with _lexer_cache_lock:
+            lexer = _lexer_cache.setdefault(key, lexer)
+    return lexer
+
+
+# codehilite looks lexers up through its module globals for every code block
+if _get_lexer_by_name is not None:
+    codehilite.get_lexer_by_name = _cached_get_lexer_by_name
+
+
+class MarkdownRenderer:
+    """Long-lived markdown renderer, reused for every post"""
+
+    def __init__(self, extensions: List[str], extension_configs: Dict[str, dict], template: str,
+                 cache_dir: Optional[str] = None, inline_css: bool = False,
+                 cache_max_age: Optional[float] = None, cache_max_bytes: Optional[int] = None):
+        """
+        Initialize the renderer
+
+        Args:
+            extensions: Markdown extension names
+            extension_configs: Per-extension configuration
+            template: HTML template with a ``{content}`` placeholder
+            cache_dir: Optional directory for caching rendered HTML
+            inline_css: Move the template's <style> rules into style attributes
+            cache_max_age: Seconds a cached file may go unused before eviction
+            cache_max_bytes: Size budget of the cache directory; least recently
+                used files are evicted beyond it
+        """
+        self.extensions = extensions
+        self.extension_configs = extension_configs
+        self.template = template
+        self.cache_dir = cache_dir
+        self.cache_max_age = cache_max_age
+        self.cache_max_bytes = cache_max_bytes
+        self.inline_css = inline_css
+        self.inliner = None
+        self._body_template = template
+        if inline_css:
+            # The stylesheet is compiled once and applied to every post
+            self._body_template, css = split_template(template)
+            self.inliner = CSSInliner(css)
+        self.config_digest = self._config_digest()
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self.evict()
+
+    def _config_digest(self) -> str:
+        """Digest of everything besides the source that affects the output"""
+        config = json.dumps({
+            'extensions': self.extensions,
+            'extension_configs': self.extension_configs,
+            'template': self.template,
+            'inline_css': self.inline_css,
+            'markdown': markdown.__version__,
+            'pygments': pygments.__version__,
+        }, sort_keys=True, default=repr)
+        return hashlib.sha256(config.encode('utf-8')).hexdigest()
+
+    def cache_key(self, text: str) -> str:
+        """Cache key for rendering text under the current configuration"""
+        sha256 = hashlib.sha256(self.config_digest.encode('utf-8'))
+        sha256.update(text.encode('utf-8'))
+        return sha256.hexdigest()
+
+    def _read_cache(self, key: str) -> Optional[str]:
+        """Return cached HTML for key, if any"""
+        cache_file = os.path.join(self.cache_dir, f"{key}.html")
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                html = f.read()
+            # The modification time doubles as last use for eviction
+            os.utime(cache_file)
+            return html
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.error(f"Error reading render cache: {str(e)}")
+            return None
+
+    def _write_cache(self, key: str, html: str):
+        """Store rendered HTML, replacing the cache file atomically"""
+        cache_file = os.path.join(self.cache_dir, f"{key}.html")
+        temp_file = f"{cache_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                f.write(html)
+            os.replace(temp_file, cache_file)
+        except OSError as e:
+            logger.error(f"Error writing render cache: {str(e)}")
+
+        with self._writes_lock:
+            self._writes += 1
+            evict = self._writes % EVICT_INTERVAL == 0
+        if evict:
+            self.evict()
+
+    def evict(self):
+        """删除长期未使用的缓存文件，并按最近使用时间将目录控制在大小上限内"""
+        if not (self.cache_max_age or self.cache_max_bytes):
+            return
+        files = []
+        try:
+            with os.scandir(self.cache_dir) as entries:
+                for entry in entries:
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    if entry.is_file():
+                        files.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError as e:
+            logger.error(f"Error scanning render cache: {str(e)}")
+            return
+
+        now = time.time()
+        total = sum(size for _, size, _ in files)
+        # Newest last, so the loop stops once the remaining files fit
+        for mtime, size, path in sorted(files):
+            expired = self.cache_max_age and now - mtime > self.cache_max_age
+            if not expired and not (self.cache_max_bytes and total > self.cache_max_bytes):
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.error(f"Error evicting render cache file {path}: {str(e)}")
+                continue
+            total -= size
+
+    def _get_markdown(self) -> markdown.Markdown:
+        """Markdown instances are stateful, so each thread builds its own once"""
+        md = getattr(self._local, 'md', None)
+        if md is None:
+            md = markdown.Markdown(
+                extensions=self.extensions,
+                extension_configs=self.extension_configs
+            )
+            self._local.md = md
+        return md
+
+    def render(self, text: str) -> str:
+        """
+        Render markdown text into the HTML template
+
+        Args:
+            text: Markdown content
+
+        Returns:
+            Full article HTML
+        """
+        key = self.cache_key(text) if self.cache_dir else None
+        if key:
+            cached = self._read_cache(key)
+            if cached is not None:
+                return cached
+
+        body = self._get_markdown().reset().convert(text)
+        # The template carries CSS braces, so str.format cannot be used here
+        html = self._body_template.replace('{content}', body)
+        if self.inliner:
+            html = self.inliner.inline(html)
+
+        if key:
+            self._write_cache(key, html)
+        return html
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Retry Policy Module
+
+Shared retry policy for WeChat API calls:
+1. Exponential backoff with full jitter between attempts
+2. Errors are classified: transient ones (system busy, minute quota,
+   network errors, 5xx) are retried, invalid requests and media fail fast
+3. Expired or invalid access tokens trigger one refresh and an immediate retry
+4. Each call has a deadline budget across all of its attempts
+5. Backoff only sleeps the calling worker thread, so concurrent posts
+   keep making progress
+"""
+
+import re
+import time
+import random
+import logging
+from typing import Callable, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Transient server-side conditions worth retrying
+RETRYABLE_ERRCODES = frozenset((
+    -1,      # system busy
+    45011,   # API minute quota reached
+    45047,   # too many requests in a short time
+))
+
+# The access token is invalid or expired; refresh it and retry once
+TOKEN_ERRCODES = frozenset((
+    40001,   # invalid credential
+    40014,   # invalid access_token
+    42001,   # access_token expired
+))
+
+# Retrying cannot help: bad media, bad request or exhausted daily quota
+FATAL_ERRCODES = frozenset((
+    40004,   # invalid media type
+    40005,   # invalid file type
+    40006,   # invalid file size
+    40007,   # invalid media_id
+    40009,   # invalid image size
+    41005,   # media data missing
+    45001,   # media file too large
+    45009,   # API daily quota reached
+))
+
+RETRY = 'retry'
+REFRESH_TOKEN = 'refresh_token'
+FAIL = 'fail'
+
+ERRCODE_RE = re.compile(r'^(-?\d+):')
+
+
+def get_errcode(error: Exception) -> Optional[int]:
+    """WeChat errcode carried by an exception, if any"""
+    errcode = getattr(error, 'errcode', None)
+    if errcode is not None:
+        return errcode
+    # werobot's ClientException only carries "errcode: errmsg"
+    match = ERRCODE_RE.match(str(error))
+    return int(match.group(1)) if match else None
+
+
+def describe_error(error: Exception) -> str:
+    """
+    Describe an error for logs without its request URL
+
+    requests puts the full URL in its messages, and the query string
+    carries the access_token, or the app secret when fetching a token.
+    """
+    if get_errcode(error) is not None or not isinstance(error, requests.RequestException):
+        return str(error)
+    request = error.request if error.request is not None else getattr(error.response, 'request', None)
+    path = urlsplit(request.url).path if request is not None and request.url else None
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        description = f"HTTP {error.response.status_code} {error.response.reason or ''}".rstrip()
+    else:
+        description = type(error).__name__
+    return f"{description} from {path}" if path else description
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts: int = 4, base_delay: float = 0.5, max_delay: float = 8.0,
+                 deadline: float = 60.0, sleep: Callable[[float], None] = time.sleep):
+        """
+        Initialize the policy
+
+        Args:
+            max_attempts: Attempts per call, including the first
+            base_delay: Backoff cap before the first retry; doubled each retry
+            max_delay: Upper bound of a single backoff
+            deadline: Seconds a call may spend across all of its attempts
+            sleep: Function used to wait between attempts
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.sleep = sleep
+
+    def classify(self, error: Exception, idempotent: bool = True) -> str:
+        """
+        Decide how to react to an error
+
+        Args:
+            error: Exception raised by the attempt
+            idempotent: Whether repeating a request that may have reached the
+                server is harmless
+
+        Returns:
+            RETRY, REFRESH_TOKEN or FAIL
+        """
+        errcode = get_errcode(error)
+        if errcode is not None:
+            if errcode in TOKEN_ERRCODES:
+                return REFRESH_TOKEN
+            if errcode in RETRYABLE_ERRCODES:
+                return RETRY
+            # FATAL_ERRCODES and unknown codes both fail fast
+            return FAIL
+
+        # Connection failures (including connect timeouts) are always retried
+        if isinstance(error, requests.ConnectionError):
+            return RETRY
+        # The server may have acted on it
+        if isinstance(error, requests.ReadTimeout):
+            return RETRY if idempotent else FAIL
+        if isinstance(error, requests.HTTPError) and error.response is not None:
+            status = error.response.status_code
+            if status == 429 or status >= 500:
+                return RETRY if idempotent or status == 429 else FAIL
+        return FAIL
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter delay before retry number attempt (1-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def call(self, operation: Callable, idempotent: bool = True,
+             on_token_error: Optional[Callable[[], None]] = None):
+        """
+        Run operation under the policy
+
+        Args:
+            operation: Callable without arguments performing one attempt
+            idempotent: See classify
+            on_token_error: Called before retrying after a token error
+
+        Returns:
+            The operation's result
+
+        Raises:
+            The last error when it is fatal, attempts run out or the
+            deadline would be exceeded
+        """
+        deadline = time.monotonic() + self.deadline
+        token_refreshed = False
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return operation()
+            except Exception as e:
+                action = self.classify(e, idempotent)
+                if action == REFRESH_TOKEN and on_token_error and not token_refreshed:
+                    # Refreshing is not a backoff case: retry right away, once
+                    logger.warning(f"Access token rejected, refreshing: {describe_error(e)}")
+                    token_refreshed = True
+                    on_token_error()
+                    continue
+                if action != RETRY or attempt >= self.max_attempts:
+                    raise
+
+                delay = self.backoff(attempt)
+                if time.monotonic() + delay > deadline:
+                    logger.error(f"Retry deadline of {self.deadline}s exceeded: {describe_error(e)}")
+                    raise
+                logger.warning(f"Retry {attempt}/{self.max_attempts - 1} in {delay:.2f}s after error: {describe_error(e)}")
+                self.sleep(delay)
@@ -0,0 +1,106 @@
+import re
+import sys
+import json
+import threading
+from datetime import date
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs, unquote
+
+import pytest
+
+# The modules live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers every request through the server's routes"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _handle(self):
+        url = urlsplit(self.path)
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.calls.append((self.command, url.path, parse_qs(url.query), body))
+        route = self.server.routes.get(url.path)
+        status, payload = route(body) if route else (200, {"errcode": 40066, "errmsg": "invalid url"})
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = _handle
+
+
+class StubServer(ThreadingHTTPServer):
+    """Local stand-in for the WeChat API"""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.calls = []  # (method, path, query, body)
+        self.routes = {
+            '/cgi-bin/token': lambda body: (200, {"access_token": "STUB_TOKEN", "expires_in": 7200}),
+        }
+        self.url = f"http://127.0.0.1:{self.server_address[1]}"
+
+    def paths(self):
+        return [path for _, path, _, _ in self.calls]
+
+
+@pytest.fixture
+def wechat_stub():
+    server = StubServer()
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def media_upload_route(body):
+    """Media upload answering with ids and URLs derived from the file name"""
+    name = unquote(re.search(rb'filename="([^"]*)"', body).group(1).decode('utf-8')).rsplit('/', 1)[-1]
+    return 200, {"type": "image", "media_id": f"media_{name}", "url": f"http://mmbiz.stub/{name.replace(' ', '_')}"}
+
+
+@pytest.fixture
+def blog(tmp_path, wechat_stub, monkeypatch):
+    """
+    A vault with a notes/ subdirectory, the publisher pointed at it and at
+    the stub server, and the working directory (caches, journal, quota
+    files) moved to tmp_path
+    """
+    import wechat_publisher
+
+    vault = tmp_path / "vault"
+    (vault / "notes" / "images").mkdir(parents=True)
+    cover = tmp_path / "cover.png"
+    cover.write_bytes(b"default cover")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(wechat_publisher, "BLOG_DIR", str(vault))
+    monkeypatch.setattr(wechat_publisher, "BLOG_SUBDIRS", ["notes"])
+    monkeypatch.setattr(wechat_publisher, "WECHAT_CONFIG", {"APP_ID": "appid", "APP_SECRET": "secret"})
+    monkeypatch.setattr(wechat_publisher, "WECHAT_API_BASE", wechat_stub.url)
+    monkeypatch.setattr(wechat_publisher, "DEFAULT_COVER_IMAGE", str(cover))
+    monkeypatch.setattr(wechat_publisher, "API_RATE_LIMIT", {
+        family: dict(limit, rate=1000, burst=1000)
+        for family, limit in wechat_publisher.API_RATE_LIMIT.items()
+    })
+    wechat_stub.routes['/cgi-bin/media/upload'] = media_upload_route
+    wechat_stub.routes['/cgi-bin/media/uploadnews'] = \
+        lambda body: (200, {"type": "news", "media_id": f"news_{len(wechat_stub.calls)}"})
+    return vault / "notes"
+
+
+def write_post(post_dir, name, body, post_date=None, images=()):
+    """Write a post dated today (or post_date) and its images"""
+    for image in images:
+        (post_dir / "images" / image).write_bytes(f"image {image}".encode('utf-8'))
+    post_date = post_date or date.today()
+    path = post_dir / name
+    path.write_text(f"---\ntitle: {path.stem}\ndate: {post_date.isoformat()}\n---\n\n{body}",
+                    encoding='utf-8')
+    return path
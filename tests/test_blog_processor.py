@@ -0,0 +1,152 @@
+import sys
+from datetime import date, timedelta
+
+import pytest
+
+from blog_processor import BlogProcessor, write_atomic
+from conftest import write_post
+
+
+def test_write_atomic_replaces_output(tmp_path):
+    output = tmp_path / "post.md"
+    output.write_text("old", encoding='utf-8')
+    write_atomic(output, iter(["new ", "content"]))
+    assert output.read_text(encoding='utf-8') == "new content"
+    assert [path.name for path in tmp_path.iterdir()] == ["post.md"]
+
+
+def test_write_atomic_keeps_original_on_failure(tmp_path):
+    output = tmp_path / "post.md"
+    output.write_text("old", encoding='utf-8')
+
+    def chunks():
+        yield "partial"
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        write_atomic(output, chunks())
+    assert output.read_text(encoding='utf-8') == "old"
+    assert [path.name for path in tmp_path.iterdir()] == ["post.md"]
+
+
+def test_write_atomic_reports_open_error(tmp_path):
+    with pytest.raises(FileNotFoundError) as excinfo:
+        write_atomic(tmp_path / "missing" / "post.md", iter(["x"]))
+    # The open() error itself, not a secondary one from the cleanup
+    assert excinfo.value.__context__ is None
+
+
+@pytest.fixture
+def notes(tmp_path, monkeypatch):
+    """A blog with a notes/ subdirectory and the working directory moved to tmp_path"""
+    import blog_processor
+
+    (tmp_path / "vault" / "notes").mkdir(parents=True)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(blog_processor, "BLOG_DIR", str(tmp_path / "vault"))
+    monkeypatch.setattr(blog_processor, "BLOG_SUBDIRS", ["notes"])
+    return tmp_path / "vault" / "notes"
+
+
+def outputs(output_dir):
+    return sorted(path.name for path in output_dir.iterdir() if path.suffix == '.md')
+
+
+def test_new_day_processes_its_posts(notes, tmp_path):
+    tomorrow = date.today() + timedelta(days=1)
+    write_post(notes, "today.md", "Today.\n")
+    write_post(notes, "tomorrow.md", "Tomorrow.\n", post_date=tomorrow)
+    processor = BlogProcessor(output_dir=str(tmp_path / "out"), incremental=True)
+    processor.process_blogs()
+    assert outputs(tmp_path / "out") == [f"processed_today_{date.today()}.md"]
+
+    processor._on_day(tomorrow)
+    assert outputs(tmp_path / "out") == [f"processed_today_{date.today()}.md",
+                                         f"processed_tomorrow_{tomorrow}.md"]
+
+
+def test_new_day_leaves_explicit_dates_alone(notes, tmp_path):
+    tomorrow = date.today() + timedelta(days=1)
+    write_post(notes, "tomorrow.md", "Tomorrow.\n", post_date=tomorrow)
+    processor = BlogProcessor(date.today().isoformat(), str(tmp_path / "out"), incremental=True)
+    processor._on_day(tomorrow)
+    assert outputs(tmp_path / "out") == []
+
+
+def test_jobs_match_a_serial_run(notes, tmp_path, monkeypatch):
+    import blog_processor
+
+    drafts = notes.parent / "drafts"
+    drafts.mkdir()
+    monkeypatch.setattr(blog_processor, "BLOG_SUBDIRS", ["notes", "drafts"])
+    first, second = date(2024, 12, 1), date(2024, 12, 2)
+    for index in range(6):
+        write_post(notes, f"post{index}.md", f"Post {index}\n\n![x](images/x{index}.png)\n",
+                   post_date=(first, second)[index % 2])
+    # Same stem and date in two directories: both write the same output
+    write_post(notes, "dup.md", "From notes.\n", post_date=first)
+    write_post(drafts, "dup.md", "From drafts.\n", post_date=first)
+    (notes / "broken.md").write_bytes(b"---\ndate: 2024-12-02\n---\n\nNot UTF-8: \xff\xfe\n")
+
+    results = {}
+    for jobs in (1, 4):
+        output_dir = tmp_path / f"out{jobs}"
+        processor = BlogProcessor(output_dir=str(output_dir), since="2024-12-01", until="2024-12-02", jobs=jobs)
+        processor.process_blogs()
+        contents = {path.name: path.read_text(encoding='utf-8') for path in output_dir.glob('*.md')}
+        results[jobs] = contents, [(path.name, error) for path, error in processor.errors]
+
+    assert results[4] == results[1]
+    contents, errors = results[1]
+    assert len(contents) == 7
+    assert contents["processed_dup_2024-12-01.md"].startswith("From notes.")
+    assert [name for name, _ in errors] == ["broken.md"]
+
+
+def test_incremental_run_skips_unchanged_and_removes_stale(notes, tmp_path, monkeypatch, capsys):
+    import blog_processor
+
+    drafts = notes.parent / "drafts"
+    drafts.mkdir()
+    monkeypatch.setattr(blog_processor, "BLOG_SUBDIRS", ["notes", "drafts"])
+    write_post(notes, "dup.md", "From notes.\n")
+    dropped = write_post(drafts, "dup.md", "From drafts.\n")
+    gone = write_post(notes, "gone.md", "Deleted later.\n")
+    output_dir = tmp_path / "out"
+    BlogProcessor(output_dir=str(output_dir), incremental=True).process_blogs()
+    assert outputs(output_dir) == [f"processed_dup_{date.today()}.md", f"processed_gone_{date.today()}.md"]
+
+    capsys.readouterr()
+    dropped.unlink()
+    gone.unlink()
+    BlogProcessor(output_dir=str(output_dir), incremental=True).process_blogs()
+    # The output drafts/dup.md shared with notes/dup.md survives; nothing is rebuilt
+    assert outputs(output_dir) == [f"processed_dup_{date.today()}.md"]
+    assert "Processed" not in capsys.readouterr().out
+
+
+def test_range_buckets_posts_by_date(notes, tmp_path, capsys):
+    days = [date(2024, 12, day) for day in (1, 2, 3, 4, 5)]
+    for name, post_date in [("b.md", days[1]), ("a.md", days[1]), ("c.md", days[3]),
+                            ("before.md", days[0]), ("after.md", days[4])]:
+        write_post(notes, name, f"{name}\n", post_date=post_date)
+    processor = BlogProcessor(output_dir=str(tmp_path / "out"), since="2024-12-02", until="2024-12-04")
+    assert processor.get_blog_files_by_date() == {days[1]: [notes / "a.md", notes / "b.md"],
+                                                  days[3]: [notes / "c.md"]}
+
+    processor.process_blogs()
+    assert outputs(tmp_path / "out") == ["processed_a_2024-12-02.md", "processed_b_2024-12-02.md",
+                                         "processed_c_2024-12-04.md"]
+    assert "No blog files found for date: 2024-12-03" in capsys.readouterr().out
+
+
+def test_since_after_until_is_rejected(notes, tmp_path, monkeypatch, capsys):
+    import blog_processor
+
+    monkeypatch.setattr(sys, "argv", ["blog_processor.py", "--output-dir", str(tmp_path / "out"),
+                                      "--since", "2024-12-05", "--until", "2024-12-01"])
+    with pytest.raises(SystemExit) as excinfo:
+        blog_processor.main()
+    assert excinfo.value.code == 2
+    assert "--since 2024-12-05 is later than --until 2024-12-01" in capsys.readouterr().err
+    assert not (tmp_path / "out").exists()
@@ -0,0 +1,65 @@
+import os
+from datetime import date
+
+from build_manifest import BuildManifest
+
+DAY = date(2024, 12, 1)
+
+
+def build(manifest, source, output):
+    output.write_text(source.read_text(encoding='utf-8'), encoding='utf-8')
+    return manifest.record(source, output, DAY)
+
+
+def test_unchanged_sources_are_current(tmp_path):
+    source, output = tmp_path / "post.md", tmp_path / "out.md"
+    source.write_text("body", encoding='utf-8')
+    manifest = BuildManifest(str(tmp_path / "manifest.json"), "config")
+    assert manifest.check(source, output) == (False, None)
+    build(manifest, source, output)
+    manifest.save()
+
+    manifest = BuildManifest(str(tmp_path / "manifest.json"), "config")
+    assert manifest.check(source, output)[0]
+    # Touched but identical content is still current
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert manifest.check(source, output)[0]
+
+    source.write_text("new body", encoding='utf-8')
+    is_current, digest = manifest.check(source, output)
+    assert not is_current and digest
+    # A different config invalidates everything
+    assert not BuildManifest(str(tmp_path / "manifest.json"), "other").check(source, output)[0]
+
+
+def test_stale_outputs_are_reported(tmp_path):
+    manifest = BuildManifest(str(tmp_path / "manifest.json"), "config")
+    sources = [tmp_path / "a.md", tmp_path / "b.md"]
+    for source in sources:
+        source.write_text(source.stem, encoding='utf-8')
+        build(manifest, source, tmp_path / f"out_{source.stem}.md")
+
+    assert manifest.remove_stale(DAY, sources[:1]) == [str(tmp_path / "out_b.md")]
+    assert manifest.remove_stale(DAY, sources[:1]) == []
+    assert list(manifest.entries) == [str(sources[0])]
+
+
+def test_shared_output_is_kept_while_still_built(tmp_path):
+    (tmp_path / "notes").mkdir()
+    (tmp_path / "drafts").mkdir()
+    a, b = tmp_path / "notes" / "post.md", tmp_path / "drafts" / "post.md"
+    output = tmp_path / "out_post.md"
+    manifest = BuildManifest(str(tmp_path / "manifest.json"), "config")
+    for source in (a, b):
+        source.write_text(str(source), encoding='utf-8')
+        build(manifest, source, output)
+
+    assert manifest.remove_stale(DAY, [a]) == []
+    assert manifest.remove_stale(DAY, []) == [str(output)]
+
+    # A source moving to a new output does not release one still in use
+    for source in (a, b):
+        build(manifest, source, output)
+    assert manifest.record(a, tmp_path / "renamed.md", DAY) is None
+    assert manifest.record(b, tmp_path / "renamed.md", DAY) == str(output)
@@ -0,0 +1,18 @@
+import markdown
+import pytest
+
+import config
+import wechat_config
+
+
+@pytest.mark.parametrize("module", [config, wechat_config])
+def test_extension_configs_use_extension_names(module):
+    # Python-Markdown ignores configs keyed by any other name
+    assert set(module.MARKDOWN_EXTENSION_CONFIGS) <= set(module.MARKDOWN_EXTENSIONS)
+
+
+@pytest.mark.parametrize("module", [config, wechat_config])
+def test_codehilite_css_class_is_applied(module):
+    html = markdown.markdown("```python\nx = 1\n```", extensions=module.MARKDOWN_EXTENSIONS,
+                             extension_configs=module.MARKDOWN_EXTENSION_CONFIGS)
+    assert 'class="highlight"' in html
@@ -0,0 +1,55 @@
+from html.parser import HTMLParser
+
+import pytest
+
+from css_inliner import CSSInliner, split_template, parse_declarations
+
+
+def style_of(document, css, tag):
+    """Style attribute of the first tag in the inlined document"""
+    styles = []
+
+    class Finder(HTMLParser):
+        def handle_starttag(self, name, attrs):
+            if name == tag:
+                styles.append(dict(attrs).get('style'))
+
+    Finder().feed(CSSInliner(css).inline(document))
+    return styles[0]
+
+
+def test_split_template():
+    body, css = split_template("<div>{content}</div>\n<style>\n p { color: red; }\n</style>\n")
+    assert body == "<div>{content}</div>\n\n"
+    assert css.strip() == "p { color: red; }"
+
+
+def test_parse_declarations():
+    assert parse_declarations(" Color: red ; ;margin:0;bad; font: a:b") == \
+        [("color", "red"), ("margin", "0"), ("font", "a:b")]
+
+
+@pytest.mark.parametrize("document, css, tag, expected", [
+    ("<p>x</p>", "p { color: red }", "p", "color: red"),
+    ('<p class="a">x</p>', ".a { color: blue } p { color: red }", "p", "color: blue"),
+    ('<p id="i" class="a">x</p>', "#i { color: green } .a { color: blue }", "p", "color: green"),
+    ("<p>x</p>", "p { color: red } p { color: blue }", "p", "color: blue"),
+    ('<p style="color: black">x</p>', "p { color: red; margin: 0 }", "p", "margin: 0; color: black"),
+    ('<div class="h"><pre><code>x</code></pre></div>', ".h code { color: red }", "code", "color: red"),
+    ("<div><code>x</code></div>", ".h code { color: red }", "code", None),
+    ('<div class="h"></div><code>x</code>', ".h code { color: red }", "code", None),
+    ("<p>x</p>", "p:hover { color: red } a > p { color: blue }", "p", None),
+])
+def test_cascade(document, css, tag, expected):
+    assert style_of(document, css, tag) == expected
+
+
+def test_document_is_copied_through():
+    document = ('<!DOCTYPE html><p class="a" data-x>T &amp; &#169; <!-- c --><br/>'
+                '<img src="a.png" alt="a &quot;b&quot;"></p><style>p { color: red }</style>')
+    assert CSSInliner("").inline(document) == document.replace("<style>p { color: red }</style>", "")
+
+
+def test_attribute_values_are_escaped():
+    html = CSSInliner('p { font-family: "A B" }').inline('<p title="&lt;x&gt;" data-x>t</p>')
+    assert html == '<p title="&lt;x&gt;" data-x style="font-family: &quot;A B&quot;">t</p>'
@@ -0,0 +1,32 @@
+import pickle
+import time
+
+from image_cache import ImageCache
+
+
+def write_legacy(path, data):
+    with open(path, 'wb') as f:
+        pickle.dump(data, f)
+
+
+def test_legacy_cache_is_migrated(tmp_path):
+    legacy = tmp_path / "cache.bin"
+    write_legacy(legacy, {
+        "fresh": {"media_id": "m1", "url": "http://mmbiz.stub/1", "expires_at": time.time() + 3600},
+        "expired": {"media_id": "m2", "expires_at": time.time() - 1},
+        "no_expiry": {"media_id": "m3"},
+    })
+    cache = ImageCache(str(tmp_path / "cache.db"), legacy_file=str(legacy))
+    assert cache.get("fresh")["media_id"] == "m1"
+    assert cache.get("expired") is None and cache.get("no_expiry") is None
+    assert not legacy.exists() and (tmp_path / "cache.bin.migrated").exists()
+
+
+def test_legacy_cache_that_is_not_a_dict_is_ignored(tmp_path, caplog):
+    legacy = tmp_path / "cache.bin"
+    write_legacy(legacy, ["not", "a", "dict"])
+    cache = ImageCache(str(tmp_path / "cache.db"), legacy_file=str(legacy))
+    assert cache.get("not") is None
+    assert "expected a dict, got list" in caplog.text
+    assert not legacy.exists()
+
@@ -0,0 +1,118 @@
+import markdown
+import pytest
+
+from image_links import scan_images, rewrite_images, rewrite_images_stream, collect_image_labels
+
+
+def paths(content):
+    return [image.path for image in scan_images(content)]
+
+
+def rewrite_stream(content):
+    lines = content.splitlines(keepends=True)
+    return ''.join(rewrite_images_stream(lines, str.upper, collect_image_labels(lines)))
+
+
+@pytest.mark.parametrize("content, expected", [
+    ("![a](images/a.png)", "images/a.png"),
+    ("![a](images/my shot.png)", "images/my shot.png"),
+    ("![a](<images/my shot.png>)", "images/my shot.png"),
+    ('![a](images/my shot.png "A title")', "images/my shot.png"),
+    ("![a]( images/a.png )", "images/a.png"),
+    ('<img alt="a" src="images/a.png">', "images/a.png"),
+    ("![a][shot]\n\n[shot]: images/a.png", "images/a.png"),
+])
+def test_scan_finds_image(content, expected):
+    assert paths(content) == [expected]
+
+
+@pytest.mark.parametrize("content", [
+    "![a](images/my shot.png)",
+    "![a](<images/my shot.png>)",
+])
+def test_scan_matches_markdown_src(content):
+    html = markdown.markdown(content)
+    assert f'src="{paths(content)[0]}"' in html
+
+
+def test_title_is_parsed():
+    image, = scan_images('![alt](images/a b.png \'Title\')')
+    assert (image.alt, image.path, image.title) == ('alt', 'images/a b.png', 'Title')
+
+
+def test_images_in_code_are_skipped():
+    content = "`![a](images/a.png)`\n\n```\n![b](images/b.png)\n```\n\n![c](images/c.png)\n"
+    assert paths(content) == ["images/c.png"]
+
+
+def test_code_span_does_not_cross_blank_line():
+    content = "Press the ` key.\n\n![a](images/a.png)\n\nThen run `ls`.\n"
+    assert paths(content) == ["images/a.png"]
+    assert 'src="images/a.png"' in markdown.markdown(content)
+
+
+def test_code_span_may_cross_single_newline():
+    assert paths("`code\n![a](images/a.png)`\n") == []
+
+
+def test_first_definition_wins():
+    content = "![a][x]\n\n[x]: images/first.png\n[x]: images/second.png\n"
+    assert paths(content) == ["images/first.png"]
+    assert rewrite_images(content, str.upper) == \
+        "![a][x]\n\n[x]: IMAGES/FIRST.PNG\n[x]: images/second.png\n"
+
+
+def test_rewrite_keeps_angle_brackets_and_title():
+    content = '![a](<images/my shot.png> "t") and ![b](images/my shot.png)\n'
+    assert rewrite_images(content, {"images/my shot.png": "http://x/s.png"}.get) == \
+        '![a](<http://x/s.png> "t") and ![b](http://x/s.png)\n'
+
+
+@pytest.mark.parametrize("content", [
+    "Press the ` key.\n\n![a](images/a.png)\n\nThen run `ls`.\n",
+    "# T\n\n![a](images/my shot.png)\n```\n![b](images/b.png)\n```\n![c][r]\n\n[r]: images/r.png\n",
+    "~~~~\n![a](a.png)\n```\n~~~~\n![b](b.png)",
+    "```\nunclosed ![a](a.png)\n",
+])
+def test_stream_matches_string(content):
+    assert rewrite_stream(content) == rewrite_images(content, str.upper)
+
+
+def test_code_lines_stream_through_unbuffered():
+    def lines():
+        yield "```\n"
+        for _ in range(3):
+            yield "code ![a](a.png)\n"
+        raise AssertionError("read past the lines already yielded")
+
+    stream = rewrite_images_stream(lines(), str.upper)
+    assert [next(stream) for _ in range(4)] == ["```\n"] + ["code ![a](a.png)\n"] * 3
+
+
+def test_backtick_code_span_at_line_start_is_not_a_fence():
+    content = "```ls``` x\n\n![z](images/real.png)"
+    assert paths(content) == ["images/real.png"]
+    assert 'src="images/real.png"' in markdown.markdown(content, extensions=['markdown.extensions.fenced_code'])
+
+
+def test_tilde_fence_info_may_contain_backticks():
+    assert paths("~~~ `x`\n![a](images/a.png)\n~~~\n") == []
+
+
+@pytest.mark.parametrize("content, expected", [
+    ("Text\n\n    ![a](images/code.png)\n\n![b](images/b.png)\n", ["images/b.png"]),
+    ("\t![a](images/code.png)\n", []),
+    ("    code\n\n    ![a](images/code.png)\nText ![b](images/b.png)\n", ["images/b.png"]),
+    # Indented lines cannot interrupt a paragraph
+    ("Text\n    ![a](images/a.png)\n", ["images/a.png"]),
+    # Nor start code inside a list item
+    ("- item\n\n    ![a](images/a.png)\n", ["images/a.png"]),
+    ("- item\n\nText\n\n    ![a](images/code.png)\n", []),
+])
+def test_indented_code_is_skipped(content, expected):
+    assert paths(content) == expected
+    rendered = markdown.markdown(content)
+    for image in expected:
+        assert f'src="{image}"' in rendered
+    assert 'src="images/code.png"' not in rendered
+    assert rewrite_stream(content) == rewrite_images(content, str.upper)
@@ -0,0 +1,35 @@
+import os
+
+import pytest
+
+PIL = pytest.importorskip("PIL")
+from PIL import Image
+
+from image_optimizer import optimize_image
+
+
+def make_jpeg(path, size, orientation=None):
+    img = Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3))
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    img.save(path, 'JPEG', quality=100, exif=exif.tobytes())
+
+
+@pytest.mark.parametrize("max_width, expected", [(1080, (100, 200)), (50, (50, 100))])
+def test_orientation_is_applied_before_resizing(tmp_path, max_width, expected):
+    source, target = tmp_path / "portrait.jpg", tmp_path / "out.jpg"
+    make_jpeg(source, (200, 100), orientation=6)
+    optimize_image(str(source), str(target), max_width, 85)
+    with Image.open(target) as img:
+        assert img.size == expected
+        assert not img.getexif().get(0x0112)
+
+
+def test_wide_image_is_resized(tmp_path):
+    source, target = tmp_path / "wide.jpg", tmp_path / "out.jpg"
+    make_jpeg(source, (400, 100))
+    source_size, target_size = optimize_image(str(source), str(target), 200, 85)
+    with Image.open(target) as img:
+        assert img.size == (200, 50)
+    assert target_size < source_size
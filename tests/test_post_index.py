@@ -0,0 +1,64 @@
+from datetime import date
+
+import frontmatter
+import pytest
+
+from post_index import PostIndex, read_frontmatter, iter_post_body
+
+SOURCES = {
+    "yaml": "---\ntitle: Hello\ndate: 2024-12-01\n---\n\nBody line\n\n```\n---\n```\n\n",
+    "no_header": "Just text\n---\nmore\n",
+    "leading_blank_lines": "\n\n---\ntitle: Late\n---\nBody\n",
+    "unterminated": "---\ntitle: Open\nBody without a closing delimiter\n",
+    "toml": "+++\ntitle = \"Toml\"\n+++\n\nBody\n",
+    "crlf": "---\r\ntitle: Windows\r\n---\r\n\r\nBody\r\nline\r\n",
+    "empty_body": "---\ntitle: Empty\n---\n",
+    "empty": "",
+}
+
+
+@pytest.fixture(params=sorted(SOURCES))
+def post(request, tmp_path):
+    path = tmp_path / f"{request.param}.md"
+    path.write_bytes(SOURCES[request.param].encode('utf-8'))
+    return path
+
+
+def test_read_frontmatter_matches_frontmatter_load(post):
+    assert read_frontmatter(post) == frontmatter.load(post).metadata
+
+
+def test_iter_post_body_matches_frontmatter_load(post):
+    assert ''.join(iter_post_body(post)) == frontmatter.load(post).content
+
+
+def test_byte_order_mark_is_skipped(tmp_path):
+    path = tmp_path / "bom.md"
+    path.write_bytes("\ufeff---\ntitle: Bom\n---\nBody\n".encode('utf-8'))
+    assert read_frontmatter(path) == {"title": "Bom"}
+    assert ''.join(iter_post_body(path)) == "Body"
+
+
+def test_index_answers_from_disk_until_files_change(tmp_path):
+    notes = tmp_path / "notes"
+    notes.mkdir()
+    first = notes / "first.md"
+    first.write_text("---\ntitle: First\ndate: 2024-12-01\n---\nBody\n", encoding='utf-8')
+    (notes / "second.md").write_text("---\ntitle: Second\n---\nBody\n", encoding='utf-8')
+
+    index_file = str(tmp_path / "index.json")
+    index = PostIndex(index_file)
+    posts = {post.path.name: post for post in index.scan(str(tmp_path), ["notes"])}
+    assert (posts["first.md"].date, posts["first.md"].title) == (date(2024, 12, 1), "First")
+    assert posts["second.md"].date is None
+    index.save()
+    assert [path.name for path in tmp_path.iterdir() if path.suffix == '.tmp'] == []
+
+    first.write_text("---\ntitle: Renamed\ndate: 2024-12-02\n---\nBody\n", encoding='utf-8')
+    (notes / "second.md").unlink()
+    reloaded = PostIndex(index_file)
+    assert set(reloaded.entries) == {str(first), str(notes / "second.md")}
+    posts = reloaded.scan(str(tmp_path), ["notes"])
+    assert [(post.path.name, post.date, post.title) for post in posts] == \
+        [("first.md", date(2024, 12, 2), "Renamed")]
+    assert set(reloaded.entries) == {str(first)}
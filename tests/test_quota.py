@@ -0,0 +1,58 @@
+from datetime import date, timedelta
+
+import pytest
+import requests
+
+import wechat_publisher
+from conftest import write_post
+from rate_limiter import ApiLimiter
+from retry_policy import RetryPolicy
+from wechat_client import WeChatClient
+from wechat_publisher import WeChatPublisher
+
+
+def test_every_attempt_is_counted(wechat_stub, tmp_path):
+    wechat_stub.routes['/cgi-bin/token'] = lambda body: (503, {})
+    limiter = ApiLimiter({"token": {"rate": 1000, "burst": 1000, "daily": 100}}, str(tmp_path / "quota.json"))
+    client = WeChatClient(
+        {"APP_ID": "appid", "APP_SECRET": "secret"},
+        str(tmp_path / "token.json"),
+        retry_policy=RetryPolicy(max_attempts=4, sleep=lambda delay: None),
+        limiter=limiter,
+        api_base=wechat_stub.url
+    )
+    with pytest.raises(requests.HTTPError):
+        client.get_access_token()
+    assert len(wechat_stub.calls) == 4
+    assert limiter.remaining("token") == 100 - 4
+
+
+@pytest.mark.parametrize("batched, published, deferred", [(False, 1, 2), (True, 3, 0)])
+def test_quota_fit_counts_batches(blog, monkeypatch, batched, published, deferred):
+    monkeypatch.setattr(wechat_publisher, "NEWS_BATCH_CONFIG",
+                        dict(wechat_publisher.NEWS_BATCH_CONFIG, enabled=batched, max_articles=8))
+    monkeypatch.setitem(wechat_publisher.API_RATE_LIMIT, "upload_news",
+                        {"rate": 1000, "burst": 1000, "daily": 1})
+    for index in range(3):
+        write_post(blog, f"post{index}.md", f"Post {index}\n")
+
+    summary = WeChatPublisher().run()
+    assert len(summary["published"]) == published
+    assert len(summary["deferred"]) == deferred
+
+
+def test_deferred_posts_are_published_by_the_next_run(blog, monkeypatch):
+    monkeypatch.setitem(wechat_publisher.API_RATE_LIMIT, "upload_news",
+                        {"rate": 1000, "burst": 1000, "daily": 1})
+    yesterday = date.today() - timedelta(days=1)
+    for index in range(3):
+        write_post(blog, f"post{index}.md", f"Post {index}\n", post_date=yesterday)
+    summary = WeChatPublisher(since=yesterday, until=yesterday).run()
+    assert [path.name for path in summary["deferred"]] == ["post1.md", "post2.md"]
+
+    # The next run only looks at today's posts, and has quota again
+    monkeypatch.setitem(wechat_publisher.API_RATE_LIMIT, "upload_news",
+                        {"rate": 1000, "burst": 1000, "daily": 10})
+    summary = WeChatPublisher().run()
+    assert sorted(path.name for path, _ in summary["published"]) == ["post1.md", "post2.md"]
+    assert not WeChatPublisher().run()["published"]
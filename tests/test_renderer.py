@@ -0,0 +1,47 @@
+import os
+import time
+
+from renderer import MarkdownRenderer
+
+TEMPLATE = "<div>{content}</div>"
+
+
+def make_renderer(cache_dir, **kwargs):
+    return MarkdownRenderer(['markdown.extensions.extra'], {}, TEMPLATE, cache_dir=str(cache_dir), **kwargs)
+
+
+def test_cached_render_is_reused(tmp_path):
+    renderer = make_renderer(tmp_path)
+    html = renderer.render("# Title")
+    assert html == "<div><h1>Title</h1></div>"
+    cache_file = tmp_path / f"{renderer.cache_key('# Title')}.html"
+    cache_file.write_text("cached", encoding='utf-8')
+    assert renderer.render("# Title") == "cached"
+
+
+def test_unused_entries_are_evicted(tmp_path):
+    renderer = make_renderer(tmp_path)
+    renderer.render("old")
+    renderer.render("recent")
+    old_file = tmp_path / f"{renderer.cache_key('old')}.html"
+    stale = time.time() - 3600
+    os.utime(old_file, (stale, stale))
+
+    make_renderer(tmp_path, cache_max_age=60)
+    assert [path.name for path in tmp_path.iterdir()] == [f"{renderer.cache_key('recent')}.html"]
+
+
+def test_least_recently_used_entries_go_over_budget(tmp_path):
+    renderer = make_renderer(tmp_path)
+    texts = ["a" * 100, "b" * 100, "c" * 100]
+    for age, text in zip((30, 20, 10), texts):
+        renderer.render(text)
+        cache_file = tmp_path / f"{renderer.cache_key(text)}.html"
+        os.utime(cache_file, (time.time() - age, time.time() - age))
+    # Reading the oldest entry marks it as recently used
+    renderer.render(texts[0])
+
+    size = (tmp_path / f"{renderer.cache_key(texts[0])}.html").stat().st_size
+    make_renderer(tmp_path, cache_max_bytes=2 * size)
+    remaining = {path.name for path in tmp_path.iterdir()}
+    assert remaining == {f"{renderer.cache_key(text)}.html" for text in (texts[0], texts[2])}
@@ -0,0 +1,71 @@
+import threading
+import time
+
+from token_manager import TokenManager
+
+
+class FetchCounter:
+    """fetch_token stand-in counting its calls"""
+
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+            calls = self.calls
+        time.sleep(self.delay)
+        return {"access_token": f"token_{calls}", "expires_in": 7200}
+
+
+def test_token_is_reused_across_instances(tmp_path):
+    fetch = FetchCounter()
+    token_file = str(tmp_path / "token.json")
+    assert TokenManager(token_file, fetch, app_id="appid").get_token() == "token_1"
+    assert TokenManager(token_file, fetch, app_id="appid").get_token() == "token_1"
+    assert fetch.calls == 1
+    # Tokens of another app are not picked up
+    assert TokenManager(token_file, fetch, app_id="other").get_token() == "token_2"
+
+
+def test_expiring_token_is_refreshed(tmp_path):
+    fetch = FetchCounter()
+    manager = TokenManager(str(tmp_path / "token.json"), fetch, refresh_margin=7200)
+    assert manager.get_token() == "token_1"
+    assert manager.get_token() == "token_2"
+
+
+def test_concurrent_refreshes_are_coalesced(tmp_path):
+    fetch = FetchCounter(delay=0.1)
+    token_file = str(tmp_path / "token.json")
+    # Separate instances stand in for separate processes sharing the file
+    managers = [TokenManager(token_file, fetch, app_id="appid") for _ in range(4)]
+    tokens = []
+
+    def get_token(manager):
+        tokens.append(manager.get_token())
+
+    threads = [threading.Thread(target=get_token, args=(manager,))
+               for manager in managers for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert fetch.calls == 1
+    assert tokens == ["token_1"] * len(threads)
+
+
+def test_invalidate_only_drops_the_rejected_token(tmp_path):
+    fetch = FetchCounter()
+    token_file = str(tmp_path / "token.json")
+    first = TokenManager(token_file, fetch)
+    second = TokenManager(token_file, fetch)
+    assert first.get_token() == "token_1"
+    first.invalidate("token_1")
+    assert second.get_token() == "token_2"
+    # A late rejection of the old token does not discard the new one
+    first.invalidate("token_1")
+    assert first.get_token() == "token_2"
+    assert fetch.calls == 2
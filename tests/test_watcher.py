@@ -0,0 +1,63 @@
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import watcher as watcher_module
+from watcher import PostWatcher
+
+
+class ScriptedBackend:
+    """Returns one scripted set of changed paths per read"""
+
+    def __init__(self, events):
+        self.events = list(events)
+
+    def read(self, timeout):
+        time.sleep(min(timeout, 0.05))
+        return self.events.pop(0) if self.events else set()
+
+
+def test_each_path_settles_on_its_own(tmp_path):
+    a, b = Path("a.md"), Path("b.md")
+    batches = []
+
+    def on_change(paths):
+        batches.append(paths)
+        if b in paths:
+            raise KeyboardInterrupt
+
+    watcher = PostWatcher(str(tmp_path), [], on_change, debounce=0.2)
+    # b keeps changing while a settles
+    watcher.backend = ScriptedBackend([{a}] + [{b}] * 6)
+    watcher.run()
+    assert batches == [{a}, {b}]
+
+
+def test_new_day_is_announced(tmp_path):
+    days = []
+
+    def on_day(today):
+        days.append(today)
+        raise KeyboardInterrupt
+
+    watcher = PostWatcher(str(tmp_path), [], lambda paths: None, on_day=on_day)
+    watcher.backend = ScriptedBackend([])
+    # The watcher started yesterday and the date has since changed
+    watcher.day = date.today() - timedelta(days=1)
+    watcher.run()
+    assert days == [date.today()]
+
+
+def test_wait_ends_at_midnight(tmp_path, monkeypatch):
+    timeouts = []
+
+    class StoppingBackend:
+        def read(self, timeout):
+            timeouts.append(timeout)
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(watcher_module, "seconds_until_midnight", lambda: 0.5)
+    watcher = PostWatcher(str(tmp_path), [], lambda paths: None)
+    watcher.backend = StoppingBackend()
+    watcher.run()
+    assert timeouts == [0.6]
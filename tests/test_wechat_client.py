@@ -0,0 +1,63 @@
+import logging
+
+import pytest
+import requests
+
+from retry_policy import RetryPolicy
+from wechat_client import WeChatClient
+
+SECRET = "APP_SECRET_VALUE"
+
+
+def make_client(stub, tmp_path, **kwargs):
+    return WeChatClient(
+        {"APP_ID": "appid", "APP_SECRET": SECRET},
+        str(tmp_path / "token.json"),
+        retry_policy=RetryPolicy(max_attempts=4, sleep=lambda delay: None),
+        api_base=stub.url,
+        **kwargs
+    )
+
+
+def test_retries_happen_once_per_policy_attempt(wechat_stub, tmp_path):
+    wechat_stub.routes['/cgi-bin/token'] = lambda body: (503, {})
+    client = make_client(wechat_stub, tmp_path)
+    with pytest.raises(requests.HTTPError):
+        client.get_access_token()
+    assert wechat_stub.paths() == ['/cgi-bin/token'] * 4
+
+
+def test_logs_do_not_contain_query_string(wechat_stub, tmp_path, caplog):
+    wechat_stub.routes['/cgi-bin/token'] = lambda body: (503, {})
+    client = make_client(wechat_stub, tmp_path)
+    with caplog.at_level(logging.WARNING), pytest.raises(requests.HTTPError):
+        client.get_access_token()
+    assert "HTTP 503" in caplog.text and "/cgi-bin/token" in caplog.text
+    assert SECRET not in caplog.text and "secret=" not in caplog.text
+
+
+def test_rejected_token_is_refreshed_once(wechat_stub, tmp_path):
+    responses = iter([(200, {"errcode": 40001, "errmsg": "invalid credential"}),
+                      (200, {"type": "news", "media_id": "news_1"})])
+    wechat_stub.routes['/cgi-bin/media/uploadnews'] = lambda body: next(responses)
+    client = make_client(wechat_stub, tmp_path)
+    assert client.upload_news([{"title": "t"}])["media_id"] == "news_1"
+    assert wechat_stub.paths() == ['/cgi-bin/token', '/cgi-bin/media/uploadnews',
+                                   '/cgi-bin/token', '/cgi-bin/media/uploadnews']
+
+
+def test_fatal_errcode_fails_fast(wechat_stub, tmp_path):
+    wechat_stub.routes['/cgi-bin/media/upload'] = \
+        lambda body: (200, {"errcode": 40005, "errmsg": "invalid file type"})
+    client = make_client(wechat_stub, tmp_path)
+    with pytest.raises(Exception, match="40005"):
+        client.upload_image(("a.png", b"data"))
+    assert wechat_stub.paths().count('/cgi-bin/media/upload') == 1
+
+
+def test_pool_only_grows(wechat_stub, tmp_path):
+    client = make_client(wechat_stub, tmp_path, http_config={"pool_size": 4, "pool_block": True})
+    client.ensure_pool_size(16)
+    client.ensure_pool_size(8)
+    adapter = client.session.get_adapter(wechat_stub.url)
+    assert (client.pool_size, adapter._pool_maxsize, adapter._pool_block) == (16, 16, True)
@@ -0,0 +1,137 @@
+import sys
+import json
+import time
+from datetime import date
+
+import pytest
+
+from conftest import write_post, media_upload_route
+from wechat_publisher import WeChatPublisher
+
+
+def uploaded_articles(stub):
+    return [article for method, path, _, body in stub.calls if path == '/cgi-bin/media/uploadnews'
+            for article in json.loads(body.decode('utf-8'))["articles"]]
+
+
+def uploaded_images(stub):
+    return [path for _, path, _, _ in stub.calls].count('/cgi-bin/media/upload')
+
+
+def test_cover_is_first_image_and_links_are_rewritten(blog, wechat_stub):
+    def slow_first_upload(body):
+        # The first image finishes last; the cover must still be the first one
+        if b'first.png"' in body:
+            time.sleep(0.2)
+        return media_upload_route(body)
+
+    wechat_stub.routes['/cgi-bin/media/upload'] = slow_first_upload
+    body = ("![first](images/first.png)\n\n"
+            "Press the ` key.\n\n"
+            "![second](images/my shot.png)\n\n"
+            "![third](<images/third.png> \"Third\")\n\n"
+            "`![code](images/code.png)` and ![first again](images/first.png)\n")
+    write_post(blog, "post.md", body, images=["first.png", "my shot.png", "third.png", "code.png"])
+
+    summary = WeChatPublisher().run(workers=1)
+    assert [path.name for path, _ in summary["published"]] == ["post.md"]
+    article, = uploaded_articles(wechat_stub)
+    assert article["thumb_media_id"] == "media_first.png"
+    for name in ("first.png", "my_shot.png", "third.png"):
+        assert f'src="http://mmbiz.stub/{name}"' in article["content"]
+    assert 'src="images/' not in article["content"]
+    # Each distinct image once; the one inside the code span is not an image
+    assert uploaded_images(wechat_stub) == 3
+
+
+def test_default_cover_is_uploaded_once(blog, wechat_stub):
+    write_post(blog, "a.md", "No images here.\n")
+    write_post(blog, "b.md", "None here either.\n")
+
+    summary = WeChatPublisher().run(workers=2)
+    assert len(summary["published"]) == 2
+    assert {article["thumb_media_id"] for article in uploaded_articles(wechat_stub)} == {"media_cover.png"}
+    assert uploaded_images(wechat_stub) == 1
+
+
+def test_rerun_skips_and_force_reuses_cached_images(blog, wechat_stub):
+    write_post(blog, "post.md", "![a](images/a.png)\n", images=["a.png"])
+    publisher = WeChatPublisher()
+    publisher.run()
+
+    assert [path.name for path, _ in publisher.run()["skipped"]] == ["post.md"]
+    publisher.force = True
+    assert len(publisher.run()["published"]) == 1
+    assert uploaded_images(wechat_stub) == 1
+    assert len(uploaded_articles(wechat_stub)) == 2
+
+
+def test_failed_upload_news_resumes_without_reuploading(blog, wechat_stub):
+    write_post(blog, "post.md", "![a](images/a.png)\n\n![b](images/b.png)\n", images=["a.png", "b.png"])
+    news_route = wechat_stub.routes['/cgi-bin/media/uploadnews']
+    wechat_stub.routes['/cgi-bin/media/uploadnews'] = \
+        lambda body: (200, {"errcode": 40007, "errmsg": "invalid media_id"})
+    publisher = WeChatPublisher()
+    assert [p.name for p, _ in publisher.run()["failed"]] == ["post.md"]
+    assert uploaded_images(wechat_stub) == 2
+
+    # A fresh publisher, as on the next run, resumes from the journal
+    wechat_stub.routes['/cgi-bin/media/uploadnews'] = news_route
+    wechat_stub.calls.clear()
+    publisher = WeChatPublisher()
+    assert [p.name for p, _ in publisher.run()["published"]] == ["post.md"]
+    assert wechat_stub.paths().count('/cgi-bin/media/upload') == 0
+    article, = uploaded_articles(wechat_stub)
+    assert article["thumb_media_id"] == "media_a.png"
+    assert 'src="http://mmbiz.stub/b.png"' in article["content"]
+
+
+def test_resume_does_not_reuse_expired_cached_media(blog, wechat_stub):
+    write_post(blog, "a.md", "![a](images/a.png)\n", images=["a.png"])
+    publisher = WeChatPublisher()
+    publisher.run()
+    # The cached image is about to expire when a second post reuses it
+    with publisher.image_cache._lock:
+        publisher.image_cache._conn.execute("UPDATE image_cache SET expires_at = ?", (time.time() + 1,))
+        publisher.image_cache._conn.commit()
+    write_post(blog, "b.md", "![again](images/a.png)\n")
+    news_route = wechat_stub.routes['/cgi-bin/media/uploadnews']
+    wechat_stub.routes['/cgi-bin/media/uploadnews'] = \
+        lambda body: (200, {"errcode": 40007, "errmsg": "invalid media_id"})
+    assert [path.name for path, _ in publisher.run()["failed"]] == ["b.md"]
+    assert uploaded_images(wechat_stub) == 1
+
+    time.sleep(1.1)
+    wechat_stub.routes['/cgi-bin/media/uploadnews'] = news_route
+    assert [path.name for path, _ in publisher.run()["published"]] == ["b.md"]
+    assert uploaded_images(wechat_stub) == 2
+
+
+def test_watch_publishes_due_posts_at_start_and_each_new_day(blog, wechat_stub, monkeypatch):
+    import wechat_publisher
+
+    class NewDayWatcher:
+        """Starts a new day once, with no file event for the post written meanwhile"""
+
+        def __init__(self, *args, on_day=None, **kwargs):
+            self.on_day = on_day
+
+        def run(self):
+            write_post(blog, "b.md", "Due on the new day.\n")
+            self.on_day(date.today())
+
+    monkeypatch.setattr(wechat_publisher, "PostWatcher", NewDayWatcher)
+    write_post(blog, "a.md", "Already due at startup.\n")
+    WeChatPublisher().watch(workers=1)
+    assert [article["title"] for article in uploaded_articles(wechat_stub)] == ["a", "b"]
+
+
+def test_since_after_until_is_rejected(blog, wechat_stub, monkeypatch, capsys):
+    import wechat_publisher
+
+    monkeypatch.setattr(sys, "argv", ["wechat_publisher.py", "--since", "2024-12-05", "--until", "2024-12-01"])
+    with pytest.raises(SystemExit) as excinfo:
+        wechat_publisher.main()
+    assert excinfo.value.code == 2
+    assert "--since 2024-12-05 is later than --until 2024-12-01" in capsys.readouterr().err
+    assert wechat_stub.calls == []
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Token Manager Module
+
+Manages the WeChat access token:
+1. Persists the token and its expiry to disk so it is reused across processes
+2. Refreshes it shortly before it expires
+3. Coalesces concurrent refreshes (threads and processes) into one request
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from typing import Callable, Optional
+
+from file_utils import file_lock
+
+logger = logging.getLogger(__name__)
+
+
+class TokenManager:
+    def __init__(self, token_file: str, fetch_token: Callable[[], dict],
+                 app_id: Optional[str] = None, refresh_margin: int = 300):
+        """
+        Initialize the token manager
+
+        Args:
+            token_file: Path of the persisted token
+            fetch_token: Callable returning {"access_token", "expires_in"}
+            app_id: App the token belongs to, tokens of other apps are ignored
+            refresh_margin: Seconds before expiry at which the token is refreshed
+        """
+        self.token_file = token_file
+        self.fetch_token = fetch_token
+        self.app_id = app_id
+        self.refresh_margin = refresh_margin
+        self._token = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, expires_at: float) -> bool:
+        return expires_at - time.time() > self.refresh_margin
+
+    def _load(self):
+        """读取磁盘上的 token"""
+        if not os.path.exists(self.token_file):
+            return
+        try:
+            with open(self.token_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('app_id') == self.app_id:
+                self._token = data['access_token']
+                self._expires_at = data['expires_at']
+        except Exception as e:
+            logger.error(f"Error loading token: {str(e)}")
+
+    def _save(self):
+        """保存 token，文件仅当前用户可读"""
+        temp_file = f"{self.token_file}.tmp"
+        try:
+            fd = os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'app_id': self.app_id,
+                    'access_token': self._token,
+                    'expires_at': self._expires_at,
+                }, f)
+            os.replace(temp_file, self.token_file)
+        except Exception as e:
+            logger.error(f"Error saving token: {str(e)}")
+
+    def invalidate(self, token: Optional[str] = None):
+        """
+        丢弃当前 token，下次调用 get_token 时重新获取
+
+        :param token: 可选，被服务器拒绝的 token；只有当前 token 仍是它时才丢弃，
+            磁盘上的副本也一并作废，避免并发请求重复刷新
+        """
+        with self._lock:
+            if token is not None and self._token not in (None, token):
+                return
+            with file_lock(self.token_file):
+                self._load()
+                if token is None or self._token == token:
+                    self._token = None
+                    self._expires_at = 0
+                    self._save()
+
+    def get_token(self) -> str:
+        """获取有效的 access token，必要时刷新"""
+        if self._token and self._is_fresh(self._expires_at):
+            return self._token
+
+        with self._lock:
+            if self._token and self._is_fresh(self._expires_at):
+                return self._token
+
+            with file_lock(self.token_file):
+                # Another process may have refreshed it while we waited
+                self._load()
+                if self._token and self._is_fresh(self._expires_at):
+                    return self._token
+
+                logger.info("Refreshing WeChat access token")
+                response = self.fetch_token()
+                self._token = response['access_token']
+                self._expires_at = time.time() + response['expires_in']
+                self._save()
+            return self._token
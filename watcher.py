@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Watcher Module
+
+Long-running watch over the blog subdirectories:
+1. Uses inotify when available (inotify_simple on Linux)
+2. Falls back to polling file stats everywhere else
+3. Debounces bursts of edits per file: a path is handed over once it has
+   been quiet for the debounce period, regardless of edits to other files
+4. Wakes up at midnight so posts dated the new day are picked up without
+   any file changing
+"""
+
+import os
+import time
+import logging
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+logger = logging.getLogger(__name__)
+
+
+def seconds_until_midnight() -> float:
+    """Seconds until the local date changes"""
+    now = datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return (midnight - now).total_seconds()
+
+
+class PollingBackend:
+    """Detects changes by comparing (mtime, size) snapshots of all markdown files"""
+
+    def __init__(self, roots: List[Path], interval: float):
+        self.roots = roots
+        self.interval = interval
+        self._snapshot = self._take_snapshot()
+
+    def _take_snapshot(self) -> Dict[Path, Tuple[int, int]]:
+        snapshot = {}
+        for root in self.roots:
+            for file in root.glob('**/*.md'):
+                try:
+                    stat = file.stat()
+                except OSError:
+                    continue
+                snapshot[file] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def read(self, timeout: float) -> Set[Path]:
+        """Wait up to timeout (at least one poll interval) and return changed paths"""
+        time.sleep(min(timeout, self.interval))
+        snapshot = self._take_snapshot()
+        changed = {path for path in snapshot.keys() | self._snapshot.keys()
+                   if snapshot.get(path) != self._snapshot.get(path)}
+        self._snapshot = snapshot
+        return changed
+
+
+class InotifyBackend:
+    """Recursive inotify watch reporting changed markdown paths"""
+
+    def __init__(self, roots: List[Path]):
+        self.inotify = INotify()
+        self.mask = (flags.CLOSE_WRITE | flags.CREATE | flags.DELETE | flags.MOVED_FROM
+                     | flags.MOVED_TO | flags.DELETE_SELF)
+        self.watches = {}
+        for root in roots:
+            self._watch_tree(root)
+
+    def _watch_tree(self, root: Path):
+        for directory, _, _ in os.walk(root):
+            try:
+                self.watches[self.inotify.add_watch(directory, self.mask)] = Path(directory)
+            except OSError as e:
+                logger.error(f"Error watching {directory}: {str(e)}")
+
+    def read(self, timeout: float) -> Set[Path]:
+        """Wait up to timeout seconds and return changed paths"""
+        changed = set()
+        for event in self.inotify.read(timeout=int(timeout * 1000)):
+            directory = self.watches.get(event.wd)
+            if directory is None:
+                continue
+            if event.mask & flags.IGNORED:
+                self.watches.pop(event.wd, None)
+                continue
+            path = directory / event.name
+            if event.mask & flags.ISDIR:
+                if event.mask & (flags.CREATE | flags.MOVED_TO):
+                    # Watch new directories and pick up files already inside
+                    self._watch_tree(path)
+                    changed.update(path.glob('**/*.md'))
+            elif path.suffix == '.md':
+                changed.add(path)
+        return changed
+
+
+class PostWatcher:
+    def __init__(self, blog_dir: str, subdirs: List[str], on_change: Callable[[Set[Path]], None],
+                 debounce: float = 2.0, poll_interval: float = 5.0,
+                 on_day: Optional[Callable[[date], None]] = None):
+        """
+        Initialize the watcher
+
+        Args:
+            blog_dir: Root blog directory
+            subdirs: Subdirectories of blog_dir to watch
+            on_change: Called with the set of changed markdown paths
+            debounce: Quiet period after a path's last event before on_change
+                receives it
+            poll_interval: Seconds between scans when inotify is unavailable
+            on_day: Called with the new date whenever the date changes
+        """
+        self.on_change = on_change
+        self.on_day = on_day
+        self.debounce = debounce
+        self.day = date.today()
+        roots = [Path(blog_dir) / subdir for subdir in subdirs if (Path(blog_dir) / subdir).exists()]
+        if INotify is not None:
+            self.backend = InotifyBackend(roots)
+            logger.info(f"Watching {len(roots)} directories with inotify")
+        else:
+            self.backend = PollingBackend(roots, poll_interval)
+            logger.info(f"Watching {len(roots)} directories by polling every {poll_interval}s")
+
+    def run(self):
+        """Watch until interrupted"""
+        pending = {}  # path -> time of its last event
+        try:
+            while True:
+                today = date.today()
+                if today != self.day:
+                    self.day = today
+                    if self.on_day:
+                        try:
+                            self.on_day(today)
+                        except Exception as e:
+                            logger.error(f"Error handling new day {today}: {str(e)}")
+
+                now = time.monotonic()
+                batch = {path for path, last_event in pending.items() if now - last_event >= self.debounce}
+                if batch:
+                    for path in batch:
+                        del pending[path]
+                    try:
+                        self.on_change(batch)
+                    except Exception as e:
+                        logger.error(f"Error handling changes: {str(e)}")
+                    continue
+
+                timeout = min(pending.values()) + self.debounce - now if pending else 60
+                # Never sleep through midnight; the small margin lands past it
+                timeout = min(timeout, seconds_until_midnight() + 0.1)
+                changed = self.backend.read(timeout)
+                now = time.monotonic()
+                for path in changed:
+                    pending[path] = now
+        except KeyboardInterrupt:
+            logger.info("Stopped watching")
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+WeChat Client Module
+
+werobot client used by the publisher:
+1. Access tokens come from a shared TokenManager instead of every process
+2. All outbound HTTP goes through one pooled keep-alive session
+3. Requests have explicit connect/read timeouts
+4. Network and API errors are retried, refreshed or failed fast per a
+   RetryPolicy, the only retry layer
+5. Calls are paced and counted per API family by an optional ApiLimiter
+6. The API host can be redirected, e.g. to a local stub server
+"""
+
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from requests.compat import json as _json
+from werobot.client import Client, ClientException
+from token_manager import TokenManager
+from retry_policy import RetryPolicy
+from rate_limiter import ApiLimiter
+
+API_BASE_URL = "https://api.weixin.qq.com"
+MEDIA_UPLOAD_URL = f"{API_BASE_URL}/cgi-bin/media/upload"
+NEWS_UPLOAD_URL = f"{API_BASE_URL}/cgi-bin/media/uploadnews"
+TOKEN_URL = f"{API_BASE_URL}/cgi-bin/token"
+
+# API family of each endpoint, for pacing and daily quotas
+API_FAMILIES = {
+    MEDIA_UPLOAD_URL: "upload_media",
+    NEWS_UPLOAD_URL: "upload_news",
+    TOKEN_URL: "token",
+}
+
+
+class WeChatAPIError(ClientException):
+    """微信接口返回的错误，带 errcode"""
+
+    def __init__(self, errcode: int, errmsg: str):
+        super().__init__(f"{errcode}: {errmsg}")
+        self.errcode = errcode
+        self.errmsg = errmsg
+
+
+def check_error(json: dict) -> dict:
+    """与 werobot 的 check_error 相同，但抛出带 errcode 的异常"""
+    if "errcode" in json and json["errcode"] != 0:
+        raise WeChatAPIError(json["errcode"], json.get("errmsg", ""))
+    return json
+
+
+def build_adapter(pool_size: int, pool_block: bool = False) -> HTTPAdapter:
+    """
+    Build a connection-pooling adapter
+
+    The adapter never retries: RetryPolicy owns retries, so every attempt
+    is paced, counted and bounded by one deadline.
+
+    Args:
+        pool_size: Connections kept open per host
+        pool_block: Wait for a free connection instead of opening one that
+            is discarded after the request
+    """
+    return HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                       pool_block=pool_block, max_retries=0)
+
+
+def build_session(pool_size: int = 10, pool_block: bool = False) -> requests.Session:
+    """
+    Build a keep-alive session shared by all outbound calls
+
+    Args:
+        pool_size: Connections kept open per host
+        pool_block: See build_adapter
+
+    Returns:
+        Configured requests session
+    """
+    adapter = build_adapter(pool_size, pool_block)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class WeChatClient(Client):
+    def __init__(self, config, token_file: str, refresh_margin: int = 300,
+                 http_config: dict = None, retry_policy: RetryPolicy = None,
+                 limiter: ApiLimiter = None, api_base: str = None):
+        super().__init__(config)
+        # werobot hardcodes the official host; requests are redirected to api_base
+        self.api_base = (api_base or API_BASE_URL).rstrip('/')
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.limiter = limiter
+        http_config = http_config or {}
+        self.pool_size = http_config.get("pool_size") or 10
+        self.pool_block = http_config.get("pool_block", False)
+        self._pool_lock = threading.Lock()
+        self.session = build_session(self.pool_size, self.pool_block)
+        self.timeout = (http_config.get("connect_timeout", 5), http_config.get("read_timeout", 30))
+        self.token_manager = TokenManager(
+            token_file,
+            self.grant_token,
+            app_id=self.appid,
+            refresh_margin=refresh_margin
+        )
+
+    def ensure_pool_size(self, pool_size: int):
+        """
+        Grow the connection pool to at least pool_size connections per host
+
+        Call it before starting more concurrent requests than the pool holds;
+        it replaces the adapter, so it must not race with requests in flight.
+        """
+        with self._pool_lock:
+            if pool_size <= self.pool_size:
+                return
+            adapter = build_adapter(pool_size, self.pool_block)
+            self.session.mount('https://', adapter)
+            self.session.mount('http://', adapter)
+            self.pool_size = pool_size
+
+    def get_access_token(self):
+        """从 TokenManager 获取 token，过期前自动刷新"""
+        return self.token_manager.get_token()
+
+    def request(self, method, url, idempotent: bool = True, **kwargs):
+        """
+        与 werobot 相同，但复用连接池、带超时，并按 retry_policy 重试
+
+        :param idempotent: 重复发送是否无害；为 False 时读超时等不重试
+        """
+        if "params" not in kwargs:
+            kwargs["params"] = {"access_token": self.token}
+        if isinstance(kwargs.get("data", ""), dict):
+            body = _json.dumps(kwargs["data"], ensure_ascii=False)
+            kwargs["data"] = body.encode('utf8')
+        kwargs.setdefault("timeout", self.timeout)
+        rejected_token = kwargs["params"].get("access_token")
+        family = API_FAMILIES.get(url)
+        if self.api_base != API_BASE_URL and url.startswith(API_BASE_URL):
+            url = self.api_base + url[len(API_BASE_URL):]
+
+        def refresh_token():
+            self.token_manager.invalidate(rejected_token)
+            kwargs["params"] = dict(kwargs["params"], access_token=self.token)
+
+        def send():
+            # Rewind uploaded files consumed by a previous attempt
+            for value in (kwargs.get("files") or {}).values():
+                file = value[1] if isinstance(value, tuple) else value
+                if hasattr(file, "seek"):
+                    file.seek(0)
+            # Every attempt counts against the quota, retries included
+            if self.limiter:
+                self.limiter.acquire(family)
+            r = self.session.request(method=method, url=url, **kwargs)
+            r.raise_for_status()
+            r.encoding = "utf-8"
+            return check_error(r.json())
+
+        return self.retry_policy.call(
+            send,
+            idempotent=idempotent,
+            on_token_error=refresh_token if rejected_token else None
+        )
+
+    def upload_news(self, articles):
+        """上传图文消息素材；可能已经创建成功的请求不会重复发送"""
+        return self.post(
+            url=NEWS_UPLOAD_URL,
+            data={"articles": articles},
+            idempotent=False
+        )
+
+    def upload_image(self, media, access_token: str = None, timeout=None):
+        """
+        上传临时图片素材
+
+        :param media: 文件对象，或 (文件名, bytes/文件对象) 元组
+        :param access_token: 可选，已获取的 token
+        :param timeout: 可选，本次请求的超时时间
+        :return: 返回的 JSON 数据包
+        """
+        return self.post(
+            url=MEDIA_UPLOAD_URL,
+            params={"access_token": access_token or self.token, "type": "image"},
+            files={"media": media},
+            timeout=timeout or self.timeout
+        )
+
+    def download(self, url: str) -> bytes:
+        """通过共享连接池下载文件"""
+        def fetch():
+            r = self.session.get(url, timeout=self.timeout)
+            r.raise_for_status()
+            return r.content
+        return self.retry_policy.call(fetch)
@@ -17,7 +17,37 @@ BLOG_DIR = os.path.expanduser("/Users/felix/workspace/working-notes")
 BLOG_SUBDIRS = ["myNotes"]
 
 # Cache configuration
-CACHE_FILE = "cache.bin"
+CACHE_DB_FILE = "cache.db"
+CACHE_FILE = "cache.bin"  # legacy pickle cache, migrated into CACHE_DB_FILE once
+CACHE_MAX_ENTRIES = 10000
+CACHE_MAX_AGE = 30 * 24 * 3600
+
+# Rendered article HTML, keyed by source and render configuration
+RENDER_CACHE_DIR = ".render_cache"
+RENDER_CACHE_MAX_AGE = 30 * 24 * 3600  # unused this long, a cached article is evicted
+RENDER_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# Uploaded images are temporary media that WeChat drops after 3 days;
+# cached media IDs expire a little earlier so they are never reused late
+IMAGE_CACHE_TTL = 3 * 24 * 3600 - 3600
+
+# Per-post publishing progress, so interrupted runs resume instead of
+# re-uploading and posts already published are not uploaded twice
+JOURNAL_DB_FILE = "journal.db"
+
+# Frontmatter index shared by post discovery in all entry points
+INDEX_FILE = "post_index.json"
+
+# Watch mode: quiet period before handling a burst of edits, and the scan
+# interval used when inotify is unavailable
+WATCH_CONFIG = {
+    "debounce": 2.0,
+    "poll_interval": 5.0,
+    # Every publish creates a WeChat draft and uses upload_news quota, so in
+    # watch mode a post is only published once it has not changed for this
+    # many seconds; editor autosaves in between do not create drafts
+    "publish_settle": 600,
+}
 
 # Base URL for blog and images
 BLOG_BASE_URL = "https://panzhixiang.cn"
@@ -28,7 +58,72 @@ WECHAT_CONFIG = {
     "APP_SECRET": os.getenv("WECHAT_APP_SECRET"),
 }
 
-# Default cover image if no image in the post
+# Base URL of the WeChat API; point it at a local stub for testing/benchmarks
+WECHAT_API_BASE = os.getenv("WECHAT_API_BASE", "https://api.weixin.qq.com")
+
+# Access token persisted between runs, refreshed this many seconds early
+TOKEN_FILE = ".wechat_token.json"
+TOKEN_REFRESH_MARGIN = 300
+
+# Shared HTTP connection pool for all outbound calls
+HTTP_CONFIG = {
+    # Keep-alive connections per host; None sizes the pool for concurrent
+    # posts x concurrent image uploads per post (see PUBLISH_CONFIG)
+    "pool_size": None,
+    "pool_block": True,  # wait for a free connection instead of opening a throwaway one
+    "connect_timeout": 5,
+    "read_timeout": 30,
+}
+
+# Retries of WeChat API errors (system busy, minute quota, network errors);
+# invalid media and other request errors fail immediately
+RETRY_CONFIG = {
+    "max_attempts": 4,
+    "base_delay": 0.5,  # first backoff is random in [0, base_delay], doubling after
+    "max_delay": 8,
+    "deadline": 60,  # seconds per call across all attempts
+}
+
+# Image upload settings
+IMAGE_UPLOAD_CONFIG = {
+    "max_workers": 4,  # concurrent uploads per post
+    "timeout": 30,  # seconds per upload request
+}
+
+# Publishing settings
+PUBLISH_CONFIG = {
+    "workers": 1,  # posts published in parallel
+}
+
+# Batch several posts into one multi-article upload_news call
+NEWS_BATCH_CONFIG = {
+    "enabled": False,
+    "max_articles": 8,  # platform maximum per news item
+    "group_by": None,  # None, "subdir" or "date"
+    "order_by": "date",  # "date", "title" or "path"
+}
+
+# Client-side pacing and daily quotas per WeChat API family. Counters are
+# kept in QUOTA_FILE and shared by all runs of the day; set "daily" to the
+# limits shown on your account's API permission page (None = unlimited)
+API_RATE_LIMIT = {
+    "upload_media": {"rate": 5, "burst": 10, "daily": 5000},  # calls per second, burst, per day
+    "upload_news": {"rate": 2, "burst": 5, "daily": 1000},
+    "token": {"rate": 1, "burst": 2, "daily": 2000},
+}
+QUOTA_FILE = ".wechat_quota.json"
+
+# Optional image optimization before upload (requires Pillow)
+IMAGE_OPTIMIZE_CONFIG = {
+    "enabled": False,
+    "max_width": 1080,  # wider images are resized
+    "quality": 85,  # JPEG recompression quality
+    "cache_dir": ".image_cache",  # optimized images, keyed by source hash
+    "workers": None,  # process pool size, defaults to CPU count
+}
+
+# Default cover image if no image in the post, either a URL or a local file path.
+# It is uploaded once and its media_id reused until it expires.
 DEFAULT_COVER_IMAGE = "https://blog.panzhixiang.cn/images/%E6%9E%B8%E6%9D%9E%E5%B2%9B%E7%9A%84%E6%97%A5%E5%87%BA.jpg"
 
 # Original article link configuration
@@ -56,13 +151,17 @@ MARKDOWN_EXTENSIONS = [
 
 # Markdown extension configurations
 MARKDOWN_EXTENSION_CONFIGS = {
-    'codehilite': {
+    'markdown.extensions.codehilite': {
         'css_class': 'highlight',
         'linenums': False,
         'guess_lang': False
     }
 }
 
+# Inline the template's <style> rules into each element's style attribute
+# (WeChat strips <style> blocks, which loses code highlighting)
+INLINE_CSS = True
+
 # HTML template for rendering
 HTML_TEMPLATE = """
 <div class="article-content">
@@ -8,63 +8,102 @@ import frontmatter
 from pathlib import Path
 import logging
 from typing import List, Dict, Optional
-import markdown
+from concurrent.futures import ThreadPoolExecutor
 from werobot import WeRoBot
-import requests
 from wechat_config import *
 import time
-import pickle
-import hashlib
 from dateutil import parser
+from file_utils import file_digest
+from post_index import PostIndex
+from image_cache import ImageCache
+from renderer import MarkdownRenderer
+from rate_limiter import ApiLimiter
+from wechat_client import WeChatClient
+from retry_policy import RetryPolicy, describe_error
+from default_cover import DefaultCover
+from image_optimizer import ImageOptimizer
+from image_links import scan_images, rewrite_images
+from publish_journal import (
+    PublishJournal,
+    STAGE_DISCOVERED,
+    STAGE_IMAGES_UPLOADED,
+    STAGE_RENDERED,
+    STAGE_DRAFT_CREATED
+)
+from watcher import PostWatcher
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-class ImageCache:
-    def __init__(self, cache_file: str):
-        self.cache_file = cache_file
-        self.cache = self._load_cache()
-        
-    def _load_cache(self) -> Dict[str, str]:
-        """加载缓存"""
-        if os.path.exists(self.cache_file):
-            try:
-                with open(self.cache_file, 'rb') as f:
-                    return pickle.load(f)
-            except Exception as e:
-                logger.error(f"Error loading cache: {str(e)}")
-        return {}
-        
-    def _save_cache(self):
-        """保存缓存"""
-        try:
-            with open(self.cache_file, 'wb') as f:
-                pickle.dump(self.cache, f)
-        except Exception as e:
-            logger.error(f"Error saving cache: {str(e)}")
-            
-    def get(self, key: str) -> Optional[str]:
-        """获取缓存"""
-        return self.cache.get(key)
-        
-    def set(self, key: str, value: str):
-        """设置缓存"""
-        self.cache[key] = value
-        self._save_cache()
-
 class ConfigurationError(Exception):
     """配置错误异常"""
     pass
 
 class WeChatPublisher:
-    def __init__(self):
+    def __init__(self, since: Optional[date] = None, until: Optional[date] = None,
+                 force: bool = False):
+        """
+        Args:
+            since: 可选，发布日期范围的第一天
+            until: 可选，发布日期范围的最后一天；只给出 since 时默认为当天
+            force: 忽略发布日志，重新发布已发布过的文章
+        """
         self._validate_config()
+        self.since = since or until
+        self.until = until
+        self.force = force
         self.robot = WeRoBot()
         self.robot.config["APP_ID"] = WECHAT_CONFIG["APP_ID"]
         self.robot.config["APP_SECRET"] = WECHAT_CONFIG["APP_SECRET"]
-        self.client = self.robot.client
-        self.token = self.client.grant_token()
-        self.image_cache = ImageCache(CACHE_FILE)
+        self.api_limiter = ApiLimiter(API_RATE_LIMIT, QUOTA_FILE)
+        self.client = WeChatClient(
+            self.robot.config,
+            TOKEN_FILE,
+            TOKEN_REFRESH_MARGIN,
+            http_config=HTTP_CONFIG,
+            retry_policy=RetryPolicy(**RETRY_CONFIG),
+            limiter=self.api_limiter,
+            api_base=WECHAT_API_BASE
+        )
+        self.image_cache = ImageCache(
+            CACHE_DB_FILE,
+            legacy_file=CACHE_FILE,
+            max_entries=CACHE_MAX_ENTRIES,
+            max_age=CACHE_MAX_AGE
+        )
+        self.post_index = PostIndex(INDEX_FILE)
+        self.journal = PublishJournal(JOURNAL_DB_FILE)
+        self.renderer = MarkdownRenderer(
+            MARKDOWN_EXTENSIONS,
+            MARKDOWN_EXTENSION_CONFIGS,
+            HTML_TEMPLATE,
+            cache_dir=RENDER_CACHE_DIR,
+            inline_css=INLINE_CSS,
+            cache_max_age=RENDER_CACHE_MAX_AGE,
+            cache_max_bytes=RENDER_CACHE_MAX_BYTES
+        )
+        self.default_cover = DefaultCover(
+            self.client,
+            DEFAULT_COVER_IMAGE,
+            self.image_cache,
+            IMAGE_CACHE_TTL
+        )
+        self.image_optimizer = self._create_image_optimizer()
+        
+    def _create_image_optimizer(self) -> Optional[ImageOptimizer]:
+        """按配置创建图片优化器，未启用或缺少 Pillow 时返回 None"""
+        if not IMAGE_OPTIMIZE_CONFIG["enabled"]:
+            return None
+        optimizer = ImageOptimizer(
+            IMAGE_OPTIMIZE_CONFIG["cache_dir"],
+            max_width=IMAGE_OPTIMIZE_CONFIG["max_width"],
+            quality=IMAGE_OPTIMIZE_CONFIG["quality"],
+            workers=IMAGE_OPTIMIZE_CONFIG["workers"]
+        )
+        if not optimizer.available:
+            logger.warning("Pillow is not installed, image optimization is disabled")
+            return None
+        return optimizer
         
     def _validate_config(self):
         """验证配置是否有效"""
@@ -104,100 +143,114 @@ class WeChatPublisher:
         if not post_date:
             return False
             
+        # Evaluated on every call so long-running processes follow the calendar
         today = datetime.now().date()
+        since = self.since or today
+        until = self.until or today
         post_date = post_date.date() if isinstance(post_date, datetime) else post_date
-        return post_date == today
+        return since <= post_date <= until
 
     def get_todays_posts(self) -> List[Path]:
-        """获取今天需要发布的文章"""
-        posts = []
-        
-        for subdir in BLOG_SUBDIRS:
-            blog_path = Path(BLOG_DIR) / subdir
-            if not blog_path.exists():
-                continue
-                
-            for post in blog_path.glob('**/*.md'):
-                try:
-                    post_data = frontmatter.load(post)
-                    post_date = self.parse_date(post_data.get('date'))
-                    if post_date and self.is_publish_date(post_date):
-                        posts.append(post)
-                except Exception as e:
-                    logger.error(f"Error processing {post}: {str(e)}")
-                    
-        return posts
+        """获取今天（或指定日期范围内）需要发布的文章，按日期排序"""
+        posts = [post for post in self.post_index.scan(BLOG_DIR, BLOG_SUBDIRS)
+                 if self.is_publish_date(post.date)]
+        posts.sort(key=lambda post: (post.date, str(post.path)))
+        for post_date in sorted({post.date for post in posts}):
+            logger.info(f"Found {sum(post.date == post_date for post in posts)} posts for {post_date}")
+        return [post.path for post in posts]
     
-    def retry_operation(self, operation, max_retries=3, delay=1):
-        """重试机制装饰器"""
-        def wrapper(*args, **kwargs):
-            retries = 0
-            while retries < max_retries:
-                try:
-                    return operation(*args, **kwargs)
-                except Exception as e:
-                    retries += 1
-                    if retries == max_retries:
-                        logger.error(f"Operation failed after {max_retries} retries: {str(e)}")
-                        raise
-                    logger.warning(f"Retry {retries}/{max_retries} after error: {str(e)}")
-                    time.sleep(delay * retries)  # 指数退避
+    def upload_image(self, image_path: str, access_token: str) -> Optional[dict]:
+        """上传单张图片，失败时返回 None"""
+        try:
+            with open(image_path, 'rb') as f:
+                return self.client.upload_image(f, access_token, IMAGE_UPLOAD_CONFIG["timeout"])
+        except Exception as e:
+            logger.error(f"Error uploading image {image_path}: {describe_error(e)}")
             return None
-        return wrapper
 
-    def process_post_images(self, content: str, post_dir: Path) -> tuple:
-        """Process article images and return processed content and first image's media_id"""
-        import re
-        
+    def upload_images(self, image_paths: List[str]) -> List[Optional[dict]]:
+        """并发上传图片，结果顺序与 image_paths 一致"""
+        if not image_paths:
+            return []
+
+        # Fetch the token once so workers do not race to refresh it
+        access_token = self.client.token
+        max_workers = min(IMAGE_UPLOAD_CONFIG["max_workers"], len(image_paths))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda path: self.upload_image(path, access_token), image_paths))
+
+    def upload_images_cached(self, image_files: List[Path]) -> List[Optional[dict]]:
+        """按内容哈希查询缓存，只上传缓存中没有的图片；结果带有 media_id 的过期时间 expires_at"""
+        digests = [file_digest(image_file) for image_file in image_files]
+        results = {digest: self.image_cache.get(digest) for digest in digests}
+
+        # Identical files shared by several paths are uploaded once
+        pending = {}
+        for digest, image_file in zip(digests, image_files):
+            if not results[digest]:
+                pending.setdefault(digest, image_file)
+
+        upload_files = list(pending.values())
+        if self.image_optimizer:
+            upload_files = self.image_optimizer.optimize(list(pending.items()))
+
+        responses = self.upload_images([str(image_file) for image_file in upload_files])
+        for digest, response in zip(pending, responses):
+            if response:
+                entry = {"media_id": response['media_id'], "url": response.get('url')}
+                expires_at = self.image_cache.set(digest, entry, IMAGE_CACHE_TTL)
+                results[digest] = dict(entry, expires_at=expires_at)
+
+        return [results[digest] for digest in digests]
+
+    def local_images(self, content: str, post_dir: Path) -> List[str]:
+        """Local image paths of a post in document order, each listed once"""
+        image_paths = []
+        for image in scan_images(content):
+            image_path = image.path
+            if not image_path.startswith(('http://', 'https://')) and image_path not in image_paths:
+                if os.path.exists(str(post_dir / image_path)):
+                    image_paths.append(image_path)
+        return image_paths
+
+    def upload_post_images(self, content: str, post_dir: Path) -> tuple:
+        """
+        Upload a post's local images
+
+        Returns:
+            (image_mappings, cover media_id, whether every image was uploaded,
+            earliest expiry of the temporary media used)
+        """
         first_image_media_id = None
         image_mappings = {}
+        image_paths = self.local_images(content, post_dir)
         
-        # Match all possible Markdown image syntax
-        image_patterns = [
-            r'!\[([^\]]*)\]\(([^)]+)\)',  # ![alt](url)
-            r'<img[^>]+src=[\'"]([^\'"]+)[\'"][^>]*>',  # <img src="url" />
-        ]
-        
-        for pattern in image_patterns:
-            matches = re.finditer(pattern, content)
-            for match in matches:
-                image_path = match.group(2) if '](' in pattern else match.group(1)
-                if not image_path.startswith(('http://', 'https://')):
-                    absolute_image_path = str(post_dir / image_path)
-                    if os.path.exists(absolute_image_path):
-                        # Upload image and get media_id for WeChat
-                        with open(absolute_image_path, 'rb') as f:
-                            try:
-                                response = self.client.upload_media('image', f)
-                                if not first_image_media_id:
-                                    first_image_media_id = response['media_id']
-                                # Get permanent URL for article content
-                                image_url = response.get('url')
-                                if image_url:
-                                    image_mappings[image_path] = image_url
-                            except Exception as e:
-                                logger.error(f"Error uploading image {absolute_image_path}: {str(e)}")
-        
-        # Replace image links in content
-        for old_path, new_url in image_mappings.items():
-            content = content.replace(old_path, new_url)
+        complete = True
+        # Cached media may have been uploaded long ago, so track the real expiry
+        expires_at = float('inf')
+        responses = self.upload_images_cached([post_dir / path for path in image_paths])
+        for image_path, response in zip(image_paths, responses):
+            if not response:
+                complete = False
+                continue
+            expires_at = min(expires_at, response['expires_at'])
+            if not first_image_media_id:
+                first_image_media_id = response['media_id']
+            # Get permanent URL for article content
+            image_url = response.get('url')
+            if image_url:
+                image_mappings[image_path] = image_url
         
-        # If no cover image found, upload default cover
+        # If no cover image found, use the shared default cover
         if not first_image_media_id:
             try:
-                response = requests.get(DEFAULT_COVER_IMAGE)
-                if response.status_code == 200:
-                    from tempfile import NamedTemporaryFile
-                    with NamedTemporaryFile(suffix='.jpg') as temp_file:
-                        temp_file.write(response.content)
-                        temp_file.flush()
-                        with open(temp_file.name, 'rb') as f:
-                            response = self.client.upload_media('image', f)
-                            first_image_media_id = response['media_id']
+                first_image_media_id, cover_expires_at = self.default_cover.get_media()
+                expires_at = min(expires_at, cover_expires_at)
             except Exception as e:
-                logger.error(f"Error uploading default cover image: {str(e)}")
+                complete = False
+                logger.error(f"Error uploading default cover image: {describe_error(e)}")
         
-        return content, first_image_media_id
+        return image_mappings, first_image_media_id, complete, expires_at
 
     def get_original_link(self, post_path: Path, post_date: datetime) -> Optional[str]:
         """生成原文链接"""
@@ -213,70 +266,372 @@ class WeChatPublisher:
             filename=filename
         )
 
-    def publish_post(self, post_path: Path):
-        """Publish a single article to WeChat Official Account"""
-        try:
-            post = frontmatter.load(post_path)
-            title = post.get('title', post_path.stem)
-            content = post.content
-            post_date = self.parse_date(post.get('date'))
-            
-            # Process images and get cover image media_id
-            processed_content, cover_media_id = self.process_post_images(content, post_path.parent)
-            
-            # Generate original link
-            original_link = None
-            if post_date:
-                original_link = self.get_original_link(post_path, post_date)
-            
-            # Add footer
-            final_content = processed_content + "\n" + ARTICLE_FOOTER
-            
-            # Convert to HTML with code highlighting
-            html_content = HTML_TEMPLATE.format(
-                content=markdown.markdown(
-                    final_content,
-                    extensions=MARKDOWN_EXTENSIONS,
-                    extension_configs=MARKDOWN_EXTENSION_CONFIGS
+    def _journal_entry(self, post_path: Path, content_hash: str):
+        """发布日志中可继续使用的进度；用到的临时素材过期后从头开始"""
+        entry = self.journal.get(post_path, content_hash)
+        if entry and not entry.reached(STAGE_DRAFT_CREATED) and entry.reached(STAGE_IMAGES_UPLOADED):
+            # Entries from before media_expires_at was recorded start over too
+            if entry.data.get("media_expires_at", 0) <= time.time():
+                return None
+        return entry
+
+    def prepare_article(self, post_path: Path, content_hash: Optional[str] = None) -> dict:
+        """
+        Upload a post's images and render it into an upload_news article
+
+        Completed stages are recorded in the publish journal, and a rerun for
+        unchanged content resumes from the last one.
+        """
+        content_hash = content_hash or file_digest(post_path)
+        entry = self._journal_entry(post_path, content_hash)
+        if entry and entry.reached(STAGE_RENDERED):
+            logger.info(f"Resuming {post_path} from stage {entry.stage}")
+            return entry.data["article"]
+        
+        post = frontmatter.load(post_path)
+        title = post.get('title', post_path.stem)
+        content = post.content
+        post_date = self.parse_date(post.get('date'))
+        
+        # Process images and get cover image media_id
+        if entry and entry.reached(STAGE_IMAGES_UPLOADED):
+            logger.info(f"Resuming {post_path} from stage {entry.stage}")
+            image_mappings = entry.data["image_mappings"]
+            cover_media_id = entry.data["cover_media_id"]
+            complete = True
+        else:
+            image_mappings, cover_media_id, complete, expires_at = \
+                self.upload_post_images(content, post_path.parent)
+            # Partial uploads are retried on the next run
+            if complete:
+                self.journal.record(
+                    post_path, content_hash, STAGE_IMAGES_UPLOADED,
+                    image_mappings=image_mappings,
+                    cover_media_id=cover_media_id,
+                    media_expires_at=expires_at
                 )
-            )
-            
-            # Create article message
-            articles = [{
-                "title": title,
-                "thumb_media_id": cover_media_id,
-                "content": html_content,
-                "digest": post.get('description', ''),
-                "author": post.get('author', ''),
-                "content_source_url": original_link if original_link else '',
-                "show_cover_pic": 1
-            }]
-            
-            # Upload article
-            @self.retry_operation
-            def _publish():
-                return self.client.upload_news(articles)
-            
-            media_id = _publish()
-            logger.info(f"Successfully published {title}")
-            if original_link:
-                logger.info(f"Original link: {original_link}")
+        processed_content = rewrite_images(content, image_mappings.get)
+        
+        # Generate original link
+        original_link = None
+        if post_date:
+            original_link = self.get_original_link(post_path, post_date)
+        
+        # Add footer
+        final_content = processed_content + "\n" + ARTICLE_FOOTER
+        
+        # Convert to HTML with code highlighting
+        html_content = self.renderer.render(final_content)
+        
+        # Create article message
+        article = {
+            "title": title,
+            "thumb_media_id": cover_media_id,
+            "content": html_content,
+            "digest": post.get('description', ''),
+            "author": post.get('author', ''),
+            "content_source_url": original_link if original_link else '',
+            "show_cover_pic": 1
+        }
+        if complete:
+            self.journal.record(post_path, content_hash, STAGE_RENDERED, article=article)
+        return article
+
+    def upload_articles(self, articles: List[dict]) -> Optional[str]:
+        """Upload one news item containing the given articles, returning its media_id"""
+        return self.client.upload_news(articles).get('media_id')
+
+    def publish_post(self, post_path: Path, content_hash: Optional[str] = None) -> Optional[str]:
+        """Publish a single article to WeChat Official Account, returning its media_id"""
+        try:
+            content_hash = content_hash or file_digest(post_path)
+            article = self.prepare_article(post_path, content_hash)
+            media_id = self.upload_articles([article])
+            self.journal.record(post_path, content_hash, STAGE_DRAFT_CREATED, media_id=media_id)
+            logger.info(f"Successfully published {article['title']}")
+            if article["content_source_url"]:
+                logger.info(f"Original link: {article['content_source_url']}")
+            return media_id
             
         except Exception as e:
-            logger.error(f"Error publishing {post_path}: {str(e)}")
+            logger.error(f"Error publishing {post_path}: {describe_error(e)}")
             raise
             
-    def run(self):
-        """运行发布程序"""
+    def _publish_isolated(self, post_path: Path, content_hash: Optional[str] = None) -> tuple:
+        """发布单篇文章，失败不影响其他文章"""
+        logger.info(f"Publishing {post_path}")
+        try:
+            return post_path, self.publish_post(post_path, content_hash), None
+        except Exception as e:
+            return post_path, None, describe_error(e)
+
+    def _prepare_isolated(self, post_path: Path, content_hash: Optional[str] = None) -> tuple:
+        """准备单篇文章，失败不影响其他文章"""
+        logger.info(f"Preparing {post_path}")
+        try:
+            return post_path, self.prepare_article(post_path, content_hash), None
+        except Exception as e:
+            logger.error(f"Error preparing {post_path}: {describe_error(e)}")
+            return post_path, None, describe_error(e)
+
+    def _upload_batch_isolated(self, batch: List[tuple], hashes: Dict[Path, str]) -> List[tuple]:
+        """上传一组文章，失败时整组标记为失败"""
+        try:
+            media_id = self.upload_articles([article for _, article in batch])
+            for post_path, _ in batch:
+                self.journal.record(post_path, hashes[post_path], STAGE_DRAFT_CREATED, media_id=media_id)
+            logger.info(f"Successfully published {', '.join(article['title'] for _, article in batch)}")
+            return [(post_path, media_id, None) for post_path, _ in batch]
+        except Exception as e:
+            logger.error(f"Error publishing batch of {len(batch)} articles: {describe_error(e)}")
+            return [(post_path, None, describe_error(e)) for post_path, _ in batch]
+
+    def batch_group(self, post_path: Path, post=None):
+        """文章在 NEWS_BATCH_CONFIG["group_by"] 下所属的分组"""
+        group_by = NEWS_BATCH_CONFIG["group_by"]
+        if group_by == "subdir":
+            return post_path.relative_to(BLOG_DIR).parts[0]
+        if group_by == "date":
+            post = post or self.post_index.lookup(post_path)
+            return post.date if post else None
+        return None
+
+    def group_batches(self, prepared: List[tuple]) -> List[List[tuple]]:
+        """
+        按 NEWS_BATCH_CONFIG 对文章排序、分组并切分成批次
+
+        Args:
+            prepared: [(post_path, article)]
+
+        Returns:
+            批次列表，每批最多 max_articles 篇文章
+        """
+        order_by = NEWS_BATCH_CONFIG["order_by"]
+        max_articles = NEWS_BATCH_CONFIG["max_articles"]
+        indexed = {post_path: self.post_index.lookup(post_path) for post_path, _ in prepared}
+
+        def sort_key(item):
+            post_path, article = item
+            if order_by == "title":
+                return (article["title"], str(post_path))
+            if order_by == "date":
+                post = indexed[post_path]
+                return (post.date if post and post.date else date.min, str(post_path))
+            return (str(post_path),)
+
+        groups = {}
+        for item in sorted(prepared, key=sort_key):
+            groups.setdefault(self.batch_group(item[0], indexed[item[0]]), []).append(item)
+
+        return [group[i:i + max_articles]
+                for group in groups.values()
+                for i in range(0, len(group), max_articles)]
+
+    def _run_batched(self, posts: List[Path], hashes: Dict[Path, str], workers: int) -> List[tuple]:
+        """先准备所有文章，再合并成尽量少的 upload_news 调用"""
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            prepared = list(executor.map(self._prepare_isolated, posts, [hashes[post] for post in posts]))
+
+        results = [(post_path, None, error) for post_path, _, error in prepared if error is not None]
+        batches = self.group_batches([(post_path, article) for post_path, article, error in prepared if error is None])
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(batches)))) as executor:
+            for batch_results in executor.map(lambda batch: self._upload_batch_isolated(batch, hashes), batches):
+                results.extend(batch_results)
+        return results
+
+    def run(self, workers: Optional[int] = None) -> Dict[str, list]:
+        """
+        运行发布程序
+
+        Args:
+            workers: 并行发布的文章数，默认使用 PUBLISH_CONFIG["workers"]
+
+        Returns:
+            {"published": [(path, media_id)], "failed": [(path, error)],
+             "skipped": [(path, media_id)], "deferred": [path]}，
+            skipped 为内容未变、已经发布过的文章，deferred 为超出今日配额、留待之后发布的文章
+        """
         posts = self.get_todays_posts()
+        # Posts deferred or failed on earlier days go first
+        return self.publish_posts(self.unfinished_posts(posts) + posts, workers)
+
+    def unfinished_posts(self, exclude: List[Path]) -> List[Path]:
+        """之前的运行发现但没有发布、仍然存在的文章（因配额推迟或失败），不含 exclude 中的文章"""
+        excluded = {str(path) for path in exclude}
+        posts = [path for path in self.journal.unfinished() if str(path) not in excluded and path.exists()]
+        if posts:
+            logger.info(f"Picking up {len(posts)} posts left unpublished by earlier runs")
+        return posts
+
+    def _pending_posts(self, posts: List[Path], summary: Dict[str, list]) -> tuple:
+        """
+        按发布日志过滤文章：当前内容已发布过的跳过，其余记为 discovered
+
+        Returns:
+            (待发布的文章, {文章: 内容哈希})
+        """
+        pending = []
+        hashes = {}
+        for post_path in posts:
+            try:
+                content_hash = file_digest(post_path)
+            except OSError as e:
+                summary["failed"].append((post_path, str(e)))
+                continue
+            if self.force:
+                self.journal.forget(post_path)
+            entry = self.journal.get(post_path, content_hash)
+            if entry and entry.reached(STAGE_DRAFT_CREATED):
+                logger.info(f"Skipping {post_path}, already published as {entry.data.get('media_id')}")
+                summary["skipped"].append((post_path, entry.data.get("media_id")))
+                continue
+            if not entry:
+                self.journal.record(post_path, content_hash, STAGE_DISCOVERED)
+            hashes[post_path] = content_hash
+            pending.append(post_path)
+        return pending, hashes
+
+    def estimate_calls(self, post_path: Path, content_hash: str) -> Dict[str, int]:
+        """
+        估算单独发布一篇文章还需要的接口调用次数（已缓存的图片和已完成的步骤不计）
+
+        合并发布时 upload_news 按批次计算，见 _fit_quota
+        """
+        entry = self._journal_entry(post_path, content_hash)
+        media_calls = 0
+        if not (entry and entry.reached(STAGE_IMAGES_UPLOADED)):
+            content = frontmatter.load(post_path).content
+            digests = {file_digest(post_path.parent / path)
+                       for path in self.local_images(content, post_path.parent)}
+            media_calls = sum(1 for digest in digests if not self.image_cache.get(digest))
+        return {"upload_media": media_calls, "upload_news": 1}
+
+    def _fit_quota(self, posts: List[Path], hashes: Dict[Path, str], summary: Dict[str, list]) -> List[Path]:
+        """
+        按顺序保留今日剩余配额能够完成的文章，其余推迟，避免中途因配额用尽而失败
+
+        Returns:
+            本次发布的文章
+        """
+        needed = {}
+        group_sizes = {}
+        for index, post_path in enumerate(posts):
+            try:
+                calls = self.estimate_calls(post_path, hashes[post_path])
+            except Exception as e:
+                # Let the publishing step report the error
+                logger.error(f"Error estimating API calls for {post_path}: {str(e)}")
+                calls = {"upload_news": 1}
+            if NEWS_BATCH_CONFIG["enabled"]:
+                # Only a post that starts a new batch costs an upload_news call
+                group = self.batch_group(post_path)
+                size = group_sizes.get(group, 0)
+                calls["upload_news"] = 1 if size % NEWS_BATCH_CONFIG["max_articles"] == 0 else 0
+                group_sizes[group] = size + 1
+            for family, count in calls.items():
+                needed[family] = needed.get(family, 0) + count
+            shortfall = self.api_limiter.shortfall(needed)
+            if shortfall:
+                summary["deferred"].extend(posts[index:])
+                logger.warning(
+                    f"Deferring {len(posts) - index} posts, today's quota is short by "
+                    + ", ".join(f"{count} {family}" for family, count in shortfall.items())
+                )
+                return posts[:index]
+        return posts
+
+    def publish_posts(self, posts: List[Path], workers: Optional[int] = None) -> Dict[str, list]:
+        """发布给定的文章，返回与 run() 相同的汇总"""
+        summary = {"published": [], "failed": [], "skipped": [], "deferred": []}
+        posts, hashes = self._pending_posts(posts, summary)
+        posts = self._fit_quota(posts, hashes, summary)
         if not posts:
-            logger.info("No posts to publish today")
-            return
-            
-        for post in posts:
-            logger.info(f"Publishing {post}")
-            self.publish_post(post)
-            
+            logger.info("No posts to publish")
+            return summary
+
+        if self.image_optimizer:
+            self.image_optimizer.reset_stats()
+
+        workers = min(workers or PUBLISH_CONFIG["workers"], len(posts))
+        if not HTTP_CONFIG.get("pool_size"):
+            # Every post uploads its images concurrently through the shared pool
+            self.client.ensure_pool_size(workers * IMAGE_UPLOAD_CONFIG["max_workers"])
+        if NEWS_BATCH_CONFIG["enabled"]:
+            results = self._run_batched(posts, hashes, workers)
+        elif workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(self._publish_isolated, posts, [hashes[post] for post in posts]))
+        else:
+            results = [self._publish_isolated(post, hashes[post]) for post in posts]
+
+        for post_path, media_id, error in results:
+            if error is None:
+                summary["published"].append((post_path, media_id))
+            else:
+                summary["failed"].append((post_path, error))
+
+        logger.info(f"Published {len(summary['published'])}/{len(posts)} posts")
+        if summary["skipped"]:
+            logger.info(f"Skipped {len(summary['skipped'])} posts already published")
+        if self.image_optimizer:
+            self.image_optimizer.shutdown()
+            logger.info(f"Image optimization saved {self.image_optimizer.bytes_saved / 1024:.1f} KB")
+        for post_path, error in summary["failed"]:
+            logger.error(f"Failed to publish {post_path}: {error}")
+        return summary
+
+    def watch(self, workers: Optional[int] = None):
+        """
+        常驻运行：启动时和每天零点发布当天到期的文章，
+        文章停止修改 WATCH_CONFIG["publish_settle"] 秒后发布受影响的文章
+        """
+        self.run(workers)
+        PostWatcher(
+            BLOG_DIR,
+            BLOG_SUBDIRS,
+            lambda paths: self._on_change(paths, workers),
+            debounce=WATCH_CONFIG["publish_settle"],
+            poll_interval=WATCH_CONFIG["poll_interval"],
+            on_day=lambda today: self.run(workers)
+        ).run()
+
+    def _on_change(self, paths, workers: Optional[int] = None):
+        """只发布发生变化且属于发布日期的文章"""
+        self.post_index.update(paths)
+        posts = []
+        for path in sorted(paths):
+            post = self.post_index.lookup(path)
+            if post and self.is_publish_date(post.date):
+                posts.append(path)
+        if posts:
+            self.publish_posts(posts, workers)
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description='Publish blog posts to WeChat')
+    arg_parser.add_argument('--workers', type=int, help='Number of posts to publish in parallel')
+    arg_parser.add_argument('--since', help='First date of a range in YYYY-MM-DD format')
+    arg_parser.add_argument('--until', help='Last date of a range in YYYY-MM-DD format (defaults to today)')
+    arg_parser.add_argument('--watch', action='store_true',
+                            help='Keep running and publish posts as they are saved')
+    arg_parser.add_argument('--force', action='store_true',
+                            help='Republish posts even if the journal says they were published')
+
+    args = arg_parser.parse_args()
+
+    since = datetime.strptime(args.since, '%Y-%m-%d').date() if args.since else None
+    until = datetime.strptime(args.until, '%Y-%m-%d').date() if args.until else None
+    if since and since > (until or date.today()):
+        arg_parser.error(f"--since {since} is later than --until {until or date.today()}")
+    publisher = WeChatPublisher(since, until, args.force)
+    if args.watch:
+        publisher.watch(args.workers)
+        return
+    summary = publisher.run(args.workers)
+    if summary["failed"]:
+        sys.exit(1)
+
 if __name__ == "__main__":
-    publisher = WeChatPublisher()
-    publisher.run()
+    main()